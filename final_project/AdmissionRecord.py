@@ -0,0 +1,74 @@
+"""
+Typed record of a single admission result, emitted by every scraper
+"""
+
+import re
+import QueryUtil
+
+# One admission result with numeric fields parsed at extraction time
+# Fields are named after the vector keys in 'QueryUtil', so 'record[QueryUtil.gpaScore]' also works
+class AdmissionRecord(object):
+
+    __slots__ = (QueryUtil.decision, QueryUtil.greVerbal, QueryUtil.greQuant, QueryUtil.greWriting,
+                 QueryUtil.gpaScore, 'gpaScale', QueryUtil.workExp, QueryUtil.research, QueryUtil.status, QueryUtil.postId)
+
+    # Constructor
+    # Scores are floats (0.0 if unknown), 'gpaScore' is out of 'gpaScale' and the other fields are 0 or 1
+    def __init__(self, decision=0, greVerbal=0.0, greQuant=0.0, greWriting=0.0, gpaScore=0.0, gpaScale=4.0,
+                 workExp=0, research=0, status=0, postId=None):
+        self.decision   = int(decision)
+        self.greVerbal  = float(greVerbal)
+        self.greQuant   = float(greQuant)
+        self.greWriting = float(greWriting)
+        self.gpaScore   = float(gpaScore)
+        self.gpaScale   = float(gpaScale)
+        self.workExp    = int(workExp)
+        self.research   = int(research)
+        self.status     = int(status)
+        self.postId     = postId
+
+    # Returns the value of a field by its key
+    def __getitem__(self, key):
+        return getattr(self, key)
+
+    # Returns the value of a field by its key, or 'default' if there is no such field
+    def get(self, key, default=None):
+        return getattr(self, key, default)
+
+    # Returns the GPA score on a 0 to 1 scale (0.0 if unknown)
+    def getNormalizedGpa(self):
+        return self.gpaScore / self.gpaScale if self.gpaScale > 0 else 0.0
+
+    # Returns the raw feature values in the column order of 'FeatureBuilder.columns'
+    def getFeatures(self):
+        return (self.getNormalizedGpa(), self.greVerbal, self.greQuant, self.greWriting,
+                self.workExp, self.research, self.status, self.decision)
+
+    def __repr__(self):
+        return 'AdmissionRecord(' + ', '.join('{}={!r}'.format(key, getattr(self, key)) for key in self.__slots__) + ')'
+
+    def __eq__(self, other):
+        return isinstance(other, AdmissionRecord) and all(getattr(self, key) == getattr(other, key) for key in self.__slots__)
+
+    def __ne__(self, other):
+        return not self == other
+
+# Returns a score parsed from a number or numeric string (0.0 if it is not a number)
+def parseScore(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+# Returns an (achieved, maximum) tuple of GPA scores parsed from a float out of 4.0
+# or an "achieved/maximum" string such as "3.5/4.0" ((0.0, 4.0) if it cannot be parsed)
+def parseGpa(value):
+    if isinstance(value, basestring):
+        match = re.match(r'\s*([0-9.]+)\s*/\s*([0-9.]+)', value)
+        if match:
+            achievedGpa, maxPossibleGpa = parseScore(match.group(1)), parseScore(match.group(2))
+            if maxPossibleGpa > 0:
+                return (achievedGpa, maxPossibleGpa)
+        return (0.0, 4.0)
+
+    return (parseScore(value), 4.0)
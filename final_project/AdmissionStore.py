@@ -0,0 +1,180 @@
+"""
+Local SQLite store of admission results, kept up to date by incremental syncs
+"""
+
+import itertools
+import os
+import sqlite3
+import FanOut
+import GoHackers
+import GradCafe
+import QueryUtil
+
+from AdmissionRecord import AdmissionRecord
+
+# Source names
+
+gradCafe  = 'GradCafe'
+goHackers = 'GoHackers'
+
+# Location of the database
+dbPath = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cache', 'admissions.db')
+
+# Seconds to wait for another connection to finish writing (e.g. queries of 'Batch.py' running at the same time)
+dbTimeout = 30.0
+
+# Numeric columns of a stored result, in the same order as in the table
+numericKeys = [QueryUtil.decision, QueryUtil.greVerbal, QueryUtil.greQuant, QueryUtil.greWriting,
+               QueryUtil.gpaScore, QueryUtil.workExp, QueryUtil.research, QueryUtil.status]
+
+# Fetches results posted since the last sync of the query from every source at the same time
+# Results are stored as they arrive and committed once their source has read every new post (see 'storeResults').
+# Sources still running after 'maxTime' seconds are stopped, and sources that could not read every new post
+# (a page or post failed) are not committed. Their new results are returned by source name instead, since posts
+# older than them would be skipped by the next sync. The number of new posts is printed if 'doPrint' is set
+def sync(query, maxTime=FanOut.maxTime, doPrint=True):
+    key = getKey(query)
+
+    # GoHackers gives better results for some refined queries
+    goQuery = dict(query)
+    QueryUtil.refineQuery(goQuery)
+
+    # Number of results added by each committed source
+    numAdded = dict()
+
+    sources = [(gradCafe, lambda: storeResults(gradCafe, key, GradCafe.iterNewResults(query, getPostIds(gradCafe, key)), numAdded)),
+               (goHackers, lambda: storeResults(goHackers, key, GoHackers.iterNewResults(goQuery, getPostIds(goHackers, key), doPrint=doPrint), numAdded))]
+
+    numNew = 0
+    unsynced = dict()
+    stopped = list()
+    failed = list()
+
+    for source in FanOut.run(sources, maxTime):
+        if source.finished:
+            numNew += numAdded[source.name]
+            continue
+
+        if source.results:
+            unsynced[source.name] = source.results
+
+        if source.error is None:
+            stopped.append(source.name)
+        else:
+            failed.append(source.name)
+
+    if doPrint:
+        print "{} new posts since last sync\n".format(numNew)
+
+        if stopped:
+            print "Stopped waiting for {} after {} seconds\n".format(' and '.join(sorted(stopped)), maxTime)
+
+        if failed:
+            print "Could not read every new post of {}, they will be fetched again next time\n".format(' and '.join(sorted(failed)))
+
+    return unsynced
+
+# Returns a tuple of stored (GradCafe, GoHackers) results for the query
+def getResults(query):
+    key = getKey(query)
+    return (loadResults(gradCafe, key), loadResults(goHackers, key))
+
+# Returns a tuple of generators of stored (GradCafe, GoHackers) results for the query,
+# reading rows from the database as they are consumed (e.g. by 'Predictor')
+# Results returned by 'sync' for sources it stopped waiting for can be given in 'unsynced'
+def iterResults(query, unsynced=None):
+    key = getKey(query)
+    unsynced = unsynced or dict()
+    return (itertools.chain(unsynced.get(gradCafe, []), iterStoredResults(gradCafe, key)),
+            itertools.chain(unsynced.get(goHackers, []), iterStoredResults(goHackers, key)))
+
+# Removes every stored result of the query
+def clear(query):
+    connection = connect()
+    with connection:
+        connection.execute('DELETE FROM admissions WHERE school = ? AND major = ? AND degree = ?', getKey(query))
+    connection.close()
+
+# Returns the normalized (school, major, degree) key of the query
+def getKey(query):
+    return QueryUtil.normalizeQuery(query)
+
+# Returns the set of stored post IDs for the source and query key
+def getPostIds(source, key):
+    connection = connect()
+    rows = connection.execute('SELECT postId FROM admissions WHERE source = ? AND school = ? AND major = ? AND degree = ?', (source,) + key)
+    postIds = set(row[0] for row in rows)
+    connection.close()
+    return postIds
+
+# Stores new results (a list or generator) of the source and returns how many were added
+def addResults(source, key, results):
+    rows = (getRow(source, key, result) for result in results if result.postId is not None)
+
+    connection = connect()
+    with connection:
+        numAdded = connection.executemany('INSERT OR IGNORE INTO admissions VALUES (' + ', '.join(['?'] * 13) + ')', rows).rowcount
+    connection.close()
+
+    return max(numAdded, 0)
+
+# Generator of the new results (a generator) of the source, inserting each one as it arrives into a table
+# of the connection only. They are added to the store in one transaction once every result is read, and the
+# number added is kept in 'numAdded' by source. Nothing is stored if the results raise or are closed early.
+# Writing to the connection's own table keeps the database free for other sources and queries meanwhile
+def storeResults(source, key, results, numAdded):
+    connection = connect()
+
+    try:
+        connection.execute('CREATE TEMP TABLE newResults AS SELECT * FROM admissions WHERE 0')
+
+        for result in results:
+            if result.postId is not None:
+                connection.execute('INSERT INTO temp.newResults VALUES (' + ', '.join(['?'] * 13) + ')', getRow(source, key, result))
+            yield result
+
+        with connection:
+            numAdded[source] = max(connection.execute('INSERT OR IGNORE INTO admissions SELECT * FROM temp.newResults').rowcount, 0)
+    finally:
+        connection.close()
+
+# Returns stored results of the source for the query key as 'AdmissionRecord's
+def loadResults(source, key):
+    return list(iterStoredResults(source, key))
+
+# Generator of stored results of the source for the query key as 'AdmissionRecord's
+def iterStoredResults(source, key):
+    connection = connect()
+
+    try:
+        rows = connection.execute('SELECT ' + ', '.join(numericKeys) + ', postId FROM admissions ' +
+                                  'WHERE source = ? AND school = ? AND major = ? AND degree = ? ORDER BY rowid', (source,) + key)
+
+        for row in rows:
+            result = dict(zip(numericKeys, row[:-1]))
+            yield AdmissionRecord(postId=row[-1], **result)
+    finally:
+        connection.close()
+
+# Returns the row of a scraped result of the source for the query key
+def getRow(source, key, result):
+    return (source,) + key + (result.postId,) + normalize(result)
+
+# Returns the numeric fields of a scraped result in the order of 'numericKeys' (GPA on a 4.0 scale)
+def normalize(result):
+    return (result.decision, result.greVerbal, result.greQuant, result.greWriting,
+            4.0 * result.getNormalizedGpa(), result.workExp, result.research, result.status)
+
+# Returns a connection to the database, creating the table if needed
+def connect():
+    directory = os.path.dirname(dbPath)
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+
+    connection = sqlite3.connect(dbPath, timeout=dbTimeout)
+    connection.execute('CREATE TABLE IF NOT EXISTS admissions ('
+                       'source TEXT, school TEXT, major TEXT, degree TEXT, postId TEXT, '
+                       'decision REAL, greVerbal REAL, greQuant REAL, greWriting REAL, '
+                       'gpaScore REAL, workExp REAL, research REAL, status REAL, '
+                       'PRIMARY KEY (source, school, major, degree, postId))')
+    return connection
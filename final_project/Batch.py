@@ -0,0 +1,216 @@
+"""
+Runs a file of GradInfo queries at the same time, writing the results of each query as JSON or CSV.
+
+Each line of the query file is "option,school,major,degree", the option being numbered as in
+the menu of GradInfo (option 1 takes the area in place of the major). Empty lines and lines
+starting with '#' are skipped:
+
+    4,Johns Hopkins University,Computer Science,PhD
+    1,,Engineering,
+
+    python Batch.py queries.csv --output results --format csv --workers 4
+
+Queries share the HTTP, session and model caches, and identical queries run once. One file
+is written per query as soon as it is done, named after its line in the query file, and
+'summary.json' (or 'summary.csv') lists every query with its number of records or its error.
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+import traceback
+import Options
+import ParsePool
+import QueryUtil
+
+from multiprocessing.pool import ThreadPool
+
+# Number of queries running at the same time (each query also fetches pages concurrently)
+numWorkers = 4
+
+# Output formats
+formats = ['json', 'csv']
+
+# Fields of the summary, in the order they are written
+summaryColumns = ['line', 'option', 'school', 'major', 'degree', 'numRecords', 'error', 'seconds', 'file']
+
+# A query of the query file and its results
+class BatchQuery:
+
+    # Constructor
+    def __init__(self, line, option, query):
+        self.line = line        # Line number in the query file
+        self.option = option    # Menu option (see 'Options.names')
+        self.query = query      # Dictionary of query information
+        self.records = None     # Records returned by 'Options.run'
+        self.error = None       # Message of the exception raised by 'Options.run', if any
+        self.seconds = None     # Seconds taken to run the query
+
+    # Returns the key shared by identical queries
+    def getKey(self):
+        return (self.option,) + QueryUtil.normalizeQuery(self.query)
+
+    # Returns the name of the file of the results
+    def getFileName(self, format):
+        values = [self.query[key] for key in [QueryUtil.schoolKey, QueryUtil.majorKey, QueryUtil.degreeKey]]
+        name = QueryUtil.normalizeName(' '.join(values)).replace(' ', '-')[:80]
+
+        return '{:05d}-{}-{}.{}'.format(self.line, Options.names[self.option], name, format)
+
+    # Returns a dictionary of the query and its results
+    def getReport(self):
+        report = dict(self.query)
+        report['line']    = self.line
+        report['option']  = self.option
+        report['name']    = Options.names[self.option]
+        report['records'] = self.records or []
+        report['error']   = self.error
+        report['seconds'] = self.seconds
+        return report
+
+# Returns the list of queries in the query file
+def readQueries(path):
+    queries = list()
+
+    with open(path, 'rb') as f:
+        for line, row in enumerate(csv.reader(f), 1):
+            row = [value.strip() for value in row]
+
+            if not any(row) or row[0].startswith('#'):
+                continue
+
+            # A header line may name the columns
+            if not queries and row[0].lower() == 'option':
+                continue
+
+            if not row[0].isdigit() or int(row[0]) not in Options.names:
+                raise ValueError('Line {}: the option must be one of {}'.format(line, sorted(Options.names)))
+
+            row += [''] * (4 - len(row))
+
+            query = dict()
+            query[QueryUtil.schoolKey] = row[1]
+            query[QueryUtil.majorKey]  = row[2]
+            query[QueryUtil.degreeKey] = row[3]
+
+            queries.append(BatchQuery(line, int(row[0]), query))
+
+    return queries
+
+# Runs the query, keeping its records or the message of the exception it raised, and returns it
+def runQuery(batchQuery):
+    start = time.time()
+
+    try:
+        batchQuery.records = Options.run(batchQuery.option, batchQuery.query)
+    except Exception as e:
+        traceback.print_exc()
+        batchQuery.error = str(e) or e.__class__.__name__
+
+    batchQuery.seconds = time.time() - start
+
+    return batchQuery
+
+# Generator of the queries in the order they are done, running 'numWorkers' queries at a time
+# Identical queries run once and are yielded together
+def run(queries, numWorkers=numWorkers):
+    identical = dict()
+    for batchQuery in queries:
+        identical.setdefault(batchQuery.getKey(), list()).append(batchQuery)
+
+    distinct = [batchQuery for batchQuery in queries if identical[batchQuery.getKey()][0] is batchQuery]
+
+    pool = ThreadPool(numWorkers)
+    try:
+        for done in pool.imap_unordered(runQuery, distinct):
+            for batchQuery in identical[done.getKey()]:
+                batchQuery.records, batchQuery.error, batchQuery.seconds = done.records, done.error, done.seconds
+                yield batchQuery
+    finally:
+        pool.terminate()
+
+# Writes the results of the query to a file in the directory and returns the name of the file
+def writeResults(batchQuery, directory, format):
+    fileName = batchQuery.getFileName(format)
+
+    if format == 'json':
+        writeJson(os.path.join(directory, fileName), batchQuery.getReport())
+    else:
+        writeCsv(os.path.join(directory, fileName), Options.columns[batchQuery.option], batchQuery.records or [])
+
+    return fileName
+
+# Writes a value as JSON
+def writeJson(path, value):
+    with open(path, 'w') as f:
+        json.dump(value, f, indent=2, sort_keys=True)
+
+# Writes records (dictionaries) as CSV with the given columns, nested values being written as JSON
+def writeCsv(path, columns, records):
+    with open(path, 'wb') as f:
+        writer = csv.writer(f)
+        writer.writerow(columns)
+
+        for record in records:
+            writer.writerow([getCsvValue(record.get(column)) for column in columns])
+
+# Returns a value as written in a CSV cell
+def getCsvValue(value):
+    if value is None:
+        return ''
+    if isinstance(value, (list, dict)):
+        return json.dumps(value, sort_keys=True)
+    if isinstance(value, unicode):
+        return value.encode('utf-8')
+    return str(value)
+
+def main():
+    parser = argparse.ArgumentParser(description='Runs a file of GradInfo queries at the same time')
+    parser.add_argument('queries', help='file of "option,school,major,degree" lines')
+    parser.add_argument('--output', default='results', help='directory to write the results to')
+    parser.add_argument('--format', choices=formats, default='json')
+    parser.add_argument('--workers', type=int, default=numWorkers, help='number of queries running at the same time')
+    args = parser.parse_args()
+
+    queries = readQueries(args.queries)
+
+    if not os.path.isdir(args.output):
+        os.makedirs(args.output)
+
+    # Start the parse processes before any fetching thread is running
+    ParsePool.start()
+
+    start = time.time()
+    summary = list()
+
+    for count, batchQuery in enumerate(run(queries, args.workers), 1):
+        fileName = writeResults(batchQuery, args.output, args.format)
+
+        print '[{}/{}] line {} ({}): {} in {:.1f}s'.format(count, len(queries), batchQuery.line, Options.names[batchQuery.option],
+            'failed, ' + batchQuery.error if batchQuery.error else str(len(batchQuery.records)) + ' records', batchQuery.seconds)
+
+        report = batchQuery.getReport()
+        report['numRecords'] = len(report.pop('records'))
+        report['file'] = fileName
+        summary.append(report)
+
+    summary.sort(key=lambda report: report['line'])
+
+    if args.format == 'json':
+        writeJson(os.path.join(args.output, 'summary.json'), summary)
+    else:
+        writeCsv(os.path.join(args.output, 'summary.csv'), summaryColumns, summary)
+
+    numFailed = sum(1 for report in summary if report['error'])
+
+    print '\n{} queries in {:.1f}s, {} failed, results in {}'.format(len(queries), time.time() - start, numFailed, args.output)
+
+    ParsePool.close()
+
+    return 1 if numFailed else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,331 @@
+"""
+Offline benchmarks for parsers, feature building and model training.
+
+Parsers are timed against the HTML pages in 'fixtures' and the machine learning
+steps against synthetic admission results, so no site is contacted. Results are
+written as JSON and can be compared with the output of an earlier run:
+
+    python Benchmark.py --output new.json --compare old.json
+"""
+
+import argparse
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import numpy as np
+import pandas
+import DepartmentDirectory
+import FacultyInfo
+import FeatureBuilder
+import GoHackers
+import GradCafe
+import QueryUtil
+import StudentInfo
+import SyntheticData
+
+from Predictor import Predictor
+
+projectDir = os.path.dirname(os.path.abspath(__file__))
+fixtureDir = os.path.join(projectDir, 'fixtures')
+
+# Default data sizes (number of admission results)
+preProcessSizes = [10 ** 3, 10 ** 4, 10 ** 5]
+fitSizes        = [10 ** 3, 10 ** 4]
+
+# Returns the contents of a fixture
+def readFixture(name):
+    with io.open(os.path.join(fixtureDir, name), encoding='utf-8') as f:
+        return f.read()
+
+# Returns the durations (in seconds) of 'repeat' calls of the function
+def measure(function, repeat):
+    durations = list()
+
+    for i in range(repeat):
+        start = time.time()
+        function()
+        durations.append(time.time() - start)
+
+    return durations
+
+# Returns the result of calling the function with 'QueryUtil.fastParse' set to the given value
+def withParseMode(fastParse, function):
+    previous = QueryUtil.fastParse
+    QueryUtil.fastParse = fastParse
+    try:
+        return function()
+    finally:
+        QueryUtil.fastParse = previous
+
+# Returns a list of (name, size, function) tuples of parser benchmarks, size being the number of pages
+def parserBenchmarks():
+    gradCafePage  = readFixture('gradcafe_survey.html')
+    goHackersPost = readFixture('gohackers_post.html')
+    facultyPage   = readFixture('faculty_page.html')
+    resume        = readFixture('indeed_resume.html')
+
+    # Same steps as GradCafe.getResults for each page
+    def gradCafe():
+        return withParseMode(False, lambda: GradCafe.extractPage(gradCafePage, 'PhD', True))
+
+    def gradCafeFast():
+        return withParseMode(True, lambda: GradCafe.extractPage(gradCafePage, 'PhD', True))
+
+    def goHackers():
+        return withParseMode(False, lambda: GoHackers.parseResult(goHackersPost, 'http://www.gohackers.com/?uid=512000', 'johns hopkins university'))
+
+    def goHackersFast():
+        return withParseMode(True, lambda: GoHackers.parseResult(goHackersPost, 'http://www.gohackers.com/?uid=512000', 'johns hopkins university'))
+
+    # Same steps as FacultyInfo.getResults for each candidate page
+    def faculty():
+        return withParseMode(False, lambda: FacultyInfo.getFacultyDescription(facultyPage))
+
+    def facultyFast():
+        return withParseMode(True, lambda: FacultyInfo.getFacultyDescription(facultyPage))
+
+    def student():
+        StudentInfo.parseResume(resume)
+
+    return [('GradCafe.getResult', 1, gradCafe),
+            ('GradCafe.getResult (fast)', 1, gradCafeFast),
+            ('GoHackers.getResult', 1, goHackers),
+            ('GoHackers.getResult (fast)', 1, goHackersFast),
+            ('FacultyInfo.getFacultyDescription', 1, faculty),
+            ('FacultyInfo.getFacultyDescription (fast)', 1, facultyFast),
+            ('StudentInfo.scrape_resume', 1, student)]
+
+# Returns whether the fast parsing mode gives the same results as full parsing on every fixture
+def checkFastParse():
+    benchmarks = dict((name, function) for name, size, function in parserBenchmarks())
+
+    if not all(benchmarks[name]() == benchmarks[name + ' (fast)']() for name in ['GradCafe.getResult', 'GoHackers.getResult']):
+        return False
+
+    # Every fixture is a candidate page for FacultyInfo, only some of them being faculty pages
+    for name in sorted(os.listdir(fixtureDir)):
+        page = readFixture(name)
+        if withParseMode(False, lambda: FacultyInfo.getFacultyDescription(page)) != withParseMode(True, lambda: FacultyInfo.getFacultyDescription(page)):
+            return False
+
+    return True
+
+# Schools and majors of the department directory entries used by 'checkDirectory'
+directorySchools = ['Johns Hopkins University', 'Carnegie Mellon University', 'University of California, Los Angeles',
+                    'University of California, San Diego', 'University of North Carolina at Chapel Hill']
+
+# (school, major, school of the entry it must find or None) of the lookups checked by 'checkDirectory'
+directoryLookups = [
+    ('John Hopkins', 'computer sci', 'Johns Hopkins University'),
+    ('Carnegie Melon University', 'CS', 'Carnegie Mellon University'),
+    ('University of California Los Angeles', 'Computer Science', 'University of California, Los Angeles'),
+    ('University of California Berkeley', 'Computer Science', None),
+    ('University of South Carolina', 'Computer Science', None),
+    ('University of California', 'Computer Science', None),
+]
+
+# Returns whether the department directory finds the entries of loosely written schools and majors,
+# and no entry of another school (e.g. another campus or state)
+def checkDirectory():
+    entries = DepartmentDirectory.entries
+
+    DepartmentDirectory.entries = dict()
+    for school in directorySchools:
+        DepartmentDirectory.entries[DepartmentDirectory.getKey(school, 'Computer Science')] = { 'school' : school, 'url' : school }
+
+    try:
+        return all(DepartmentDirectory.lookup(school, major) == expected for school, major, expected in directoryLookups)
+    finally:
+        DepartmentDirectory.entries = entries
+
+# Returns a list of (name, size, function) tuples of machine learning benchmarks
+def modelBenchmarks(preProcessSizes, fitSizes):
+    benchmarks = list()
+
+    for size in preProcessSizes:
+        gradResults, goResults = SyntheticData.generateResults(size, seed=size)
+
+        # Same steps as the constructor of Predictor before the data is split
+        def preProcess(gradResults=gradResults, goResults=goResults):
+            data = FeatureBuilder.buildMatrix(gradResults, goResults)
+            np.random.shuffle(data)
+
+        benchmarks.append(('Predictor.preProcess', size, preProcess))
+
+    for size in fitSizes:
+        gradResults, goResults = SyntheticData.generateResults(size, seed=size)
+
+        def fit(gradResults=gradResults, goResults=goResults):
+            Predictor(gradResults, goResults)
+
+        benchmarks.append(('Predictor.fit', size, fit))
+
+    return benchmarks
+
+# Returns the durations (in seconds) of 'repeat' starts of a menu script in a new process until its menu is shown
+# Rankings are not loaded in the background, so no site is contacted
+def measureMenu(script, repeat):
+    env = dict(os.environ)
+    env['GRADINFO_NO_PREFETCH'] = '1'
+
+    durations = list()
+
+    for i in range(repeat):
+        start = time.time()
+
+        process = subprocess.Popen([sys.executable, '-u', script], cwd=projectDir, stdin=subprocess.PIPE, stdout=subprocess.PIPE, env=env)
+
+        for line in iter(process.stdout.readline, ''):
+            if 'OPTIONS' in line:
+                break
+
+        durations.append(time.time() - start)
+
+        # Quit (option 6) before the next start
+        process.communicate('6\n')
+
+    return durations
+
+# Seconds a user takes to type a query after the menu is shown
+thinkTime = 2.0
+
+# Number of parse processes when timing a first query
+firstQueryProcesses = 4
+
+# Script timing the parses of the first query in a new process started like GradInfo (parse processes are
+# forked before any scraper is imported, which is done in the background), the query coming after 'thinkTime'
+firstQueryScript = """
+import io, sys, time
+import ParsePool, Warmup
+from multiprocessing.pool import ThreadPool
+
+ParsePool.start()
+Warmup.start(Warmup.optionModules)
+time.sleep(float(sys.argv[1]))
+
+GradCafe, GoHackers, FacultyInfo = [Warmup.load(name) for name in ['GradCafe', 'GoHackers', 'FacultyInfo']]
+
+def read(name):
+    with io.open('fixtures/' + name, encoding='utf-8') as f:
+        return f.read()
+
+tasks = ([(GradCafe.extractPage, read('gradcafe_survey.html'), 'PhD', True)] * 3 +
+         [(GoHackers.parseResult, read('gohackers_post.html'), 'http://www.gohackers.com/?uid=512000', 'johns hopkins university')] * 3 +
+         [(FacultyInfo.getFacultyDescription, read('faculty_page.html'))] * 2)
+
+start = time.time()
+ThreadPool(len(tasks)).map(lambda task: ParsePool.apply(*task), tasks)
+print time.time() - start
+
+ParsePool.close()
+"""
+
+# Returns the durations (in seconds) of the parses of the first query (see 'firstQueryScript') in 'repeat' new processes
+def measureFirstQuery(thinkTime, repeat):
+    env = dict(os.environ)
+    env['GRADINFO_PARSE_PROCESSES'] = str(firstQueryProcesses)
+
+    durations = list()
+
+    for i in range(repeat):
+        output = subprocess.check_output([sys.executable, '-c', firstQueryScript, str(thinkTime)], cwd=projectDir, env=env)
+        durations.append(float(output.split()[-1]))
+
+    return durations
+
+# Returns a list of (name, size, function) tuples of import benchmarks, each run in a new process
+def importBenchmarks():
+    # Modules that GradInfo imports in the background after showing its menu
+    def optionModules():
+        subprocess.check_call([sys.executable, '-c', 'import Warmup\nfor name in Warmup.optionModules: Warmup.load(name)'], cwd=projectDir)
+
+    return [('GradInfo option modules', 1, optionModules)]
+
+# Runs the benchmarks and returns a list of result dictionaries
+# The parameter 'measure' returns the durations of 'repeat' runs of the function of a benchmark
+def run(benchmarks, repeat, measure=measure):
+    results = list()
+
+    for name, size, function in benchmarks:
+        durations = measure(function, repeat)
+
+        result = dict()
+        result['name']   = name
+        result['size']   = size
+        result['repeat'] = repeat
+        result['best']   = min(durations)
+        result['mean']   = sum(durations) / len(durations)
+
+        results.append(result)
+
+        print '{:<44}{:>10}  best {:.6f}s  mean {:.6f}s'.format(name, size, result['best'], result['mean'])
+
+    return results
+
+# Prints how the best times of 'results' compare with those of an earlier run
+def compare(results, previousResults):
+    previous = dict(((result['name'], result['size']), result['best']) for result in previousResults)
+
+    rows = list()
+
+    for result in results:
+        key = (result['name'], result['size'])
+        if key in previous and previous[key] > 0:
+            rows.append([result['name'], result['size'], '{:.6f}'.format(previous[key]), '{:.6f}'.format(result['best']),
+                         '{:.2f}x'.format(previous[key] / result['best']) if result['best'] > 0 else 'inf'])
+
+    header = ['Benchmark', 'Size', 'Previous Best (s)', 'Best (s)', 'Speedup']
+
+    pandas.set_option('display.width', 1000)
+    print pandas.DataFrame(rows, columns=header, index=range(len(rows)))
+
+def main():
+    parser = argparse.ArgumentParser(description='Offline benchmarks for the Graduate School IR Engine')
+    parser.add_argument('--sizes', type=int, nargs='+', default=preProcessSizes, help='numbers of results for Predictor.preProcess')
+    parser.add_argument('--fit-sizes', type=int, nargs='+', default=fitSizes, help='numbers of results for Predictor.fit')
+    parser.add_argument('--repeat', type=int, default=5, help='number of times each benchmark is run')
+    parser.add_argument('--output', help='file to write the results to (JSON)')
+    parser.add_argument('--compare', help='results of an earlier run (JSON) to compare with')
+    args = parser.parse_args()
+
+    print "Startup (new process each time):"
+    results = run([('GradInfo (until the menu is shown)', 1, 'GradInfo.py')], args.repeat, measureMenu)
+    results += run(importBenchmarks(), args.repeat)
+    results += run([('GradInfo first query parses', 8, thinkTime)], args.repeat, measureFirstQuery)
+
+    fastParseMatches = checkFastParse()
+
+    print "\nFast parsing gives the same results as full parsing: " + ("yes" if fastParseMatches else "NO")
+
+    directoryMatches = checkDirectory()
+
+    print "Department directory only matches the same school: " + ("yes" if directoryMatches else "NO")
+
+    print "\nParsers (one fixture page each):"
+    results += run(parserBenchmarks(), args.repeat)
+
+    print "\nMachine learning (synthetic results):"
+    results += run(modelBenchmarks(args.sizes, args.fit_sizes), args.repeat)
+
+    report = dict()
+    report['created']    = time.strftime('%Y-%m-%dT%H:%M:%S')
+    report['python']     = platform.python_version()
+    report['fastParseMatches'] = fastParseMatches
+    report['directoryMatches'] = directoryMatches
+    report['benchmarks'] = results
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            print "\nCompared with " + args.compare + ":"
+            compare(results, json.load(f)['benchmarks'])
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,140 @@
+"""
+Multi-threaded crawl engine with a frontier of URLs.
+
+URLs are normalized and visited at most once, with a limit on the number of
+pages fetched from the same domain at a time. A crawl stops at a deadline or once
+enough results are found, and results are handed back as soon as they are
+confirmed. Threads are used for concurrency as asyncio is not available in Python 2.
+"""
+
+import Queue
+import threading
+import time
+import urlparse
+
+class Crawler:
+
+    # Constructor
+    #   visit      : function(crawler, url, item) returning the result for the page at the URL, or None
+    #                (it can add more URLs to the frontier with 'crawler.add')
+    #   numWorkers : number of pages visited at the same time
+    #   perDomain  : number of pages of the same domain visited at the same time
+    #   maxTime    : seconds after which the crawl stops
+    #   maxResults : number of results after which the crawl stops (no limit if None)
+    def __init__(self, visit, numWorkers=8, perDomain=4, maxTime=60, maxResults=None):
+        self.visit = visit
+        self.numWorkers = numWorkers
+        self.perDomain = perDomain
+        self.maxTime = maxTime
+        self.maxResults = maxResults
+
+        self.frontier = Queue.Queue()  # (url, item) tuples waiting to be visited
+        self.results = Queue.Queue()   # (url, item, result) tuples waiting to be handed back
+        self.seen = set()              # Normalized URLs added so far
+        self.numPending = 0            # URLs added but not visited yet
+        self.domainLimits = dict()
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.timedOut = False
+
+    # Adds a URL with an item handed to 'visit' unless the same URL has been added before
+    # Returns whether the URL was added
+    def add(self, url, item=None):
+        url = normalizeUrl(url)
+
+        with self.lock:
+            if url in self.seen or self.stopped.is_set():
+                return False
+            self.seen.add(url)
+            self.numPending += 1
+
+        self.frontier.put((url, item))
+
+        return True
+
+    # Generator of (url, item, result) tuples for the visited pages with a result, in the order they are found
+    def crawl(self):
+        deadline = time.time() + self.maxTime
+
+        for i in range(self.numWorkers):
+            worker = threading.Thread(target=self.work)
+            worker.daemon = True
+            worker.start()
+
+        numResults = 0
+
+        try:
+            while self.maxResults is None or numResults < self.maxResults:
+                remaining = deadline - time.time()
+
+                if remaining <= 0:
+                    self.timedOut = True
+                    break
+
+                # Workers hand back a result before counting its URL as visited
+                with self.lock:
+                    done = self.numPending == 0
+
+                try:
+                    yield self.results.get(timeout=min(remaining, 0.1))
+                    numResults += 1
+                except Queue.Empty:
+                    if done:
+                        break
+        finally:
+            self.stop()
+
+    # Stops the workers once they finish the pages they are visiting
+    def stop(self):
+        self.stopped.set()
+
+    # Worker visiting URLs from the frontier until the crawl stops
+    def work(self):
+        while not self.stopped.is_set():
+            try:
+                url, item = self.frontier.get(timeout=0.1)
+            except Queue.Empty:
+                continue
+
+            try:
+                if not self.stopped.is_set():
+                    with self.getDomainLimit(url):
+                        result = self.visit(self, url, item)
+
+                    if result is not None:
+                        self.results.put((url, item, result))
+            except Exception:
+                pass  # Skip pages that cannot be fetched or parsed
+            finally:
+                with self.lock:
+                    self.numPending -= 1
+
+    # Returns the semaphore limiting visits to the domain of the URL
+    def getDomainLimit(self, url):
+        domain = urlparse.urlsplit(url).netloc
+
+        with self.lock:
+            if domain not in self.domainLimits:
+                self.domainLimits[domain] = threading.BoundedSemaphore(self.perDomain)
+            return self.domainLimits[domain]
+
+# Returns the URL resolved against 'base' (for relative URLs) without its fragment,
+# with a lower case scheme and host, without default ports and with a path of at least '/'
+def normalizeUrl(url, base=None):
+    url = url.strip()
+
+    if base:
+        url = urlparse.urljoin(base, url)
+
+    scheme, netloc, path, query, fragment = urlparse.urlsplit(url)
+
+    scheme = scheme.lower()
+    netloc = netloc.lower()
+
+    if (scheme == 'http' and netloc.endswith(':80')) or (scheme == 'https' and netloc.endswith(':443')):
+        netloc = netloc.rsplit(':', 1)[0]
+
+    if netloc and not path:
+        path = '/'
+
+    return urlparse.urlunsplit((scheme, netloc, path, query, ''))
@@ -0,0 +1,158 @@
+"""
+Local directory of department faculty pages, looked up by school and major before searching Google.
+
+Entries come from a seed file shipped with the project and from earlier searches whose faculty
+pages turned out to list faculty members. School and major names are matched loosely, so
+"John Hopkins" and "computer sci" find the entry of "Johns Hopkins University" and
+"Computer Science". Schools only match if they share their distinguishing words (campus, state, ...),
+so "University of South Carolina" does not find "University of North Carolina". Google is searched
+only when no entry matches.
+"""
+
+import difflib
+import json
+import os
+import threading
+import QueryUtil
+
+# Settings
+
+seedPath    = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'departments.json')
+learnedPath = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cache', 'departments.json')
+minScore    = 0.85  # Similarity (0 to 1) both the school and the major of an entry must reach to match
+
+# Words of school names that do not tell schools apart
+fillerWords = set(['university', 'univ', 'of', 'the', 'at', 'in', 'and'])
+
+# Common abbreviations of majors
+majorAliases = {
+    'cs'   : 'computer science',
+    'ece'  : 'electrical and computer engineering',
+    'ee'   : 'electrical engineering',
+    'me'   : 'mechanical engineering',
+    'econ' : 'economics',
+    'bme'  : 'biomedical engineering',
+}
+
+# Entries by normalized (school, major), loaded on first use
+entries = None
+
+lock = threading.Lock()
+
+# Returns the URL of the faculty page of the major at the school, searching Google if no entry matches
+# (None if there is no entry and nothing was found)
+def resolve(school, major):
+    url = lookup(school, major)
+
+    if url:
+        return url
+
+    return QueryUtil.google(school + ' ' + major + ' faculty')
+
+# Returns the URL of the entry best matching the school and major, or None if no entry matches
+def lookup(school, major):
+    school, major = getKey(school, major)
+
+    with lock:
+        loadEntries()
+
+        if (school, major) in entries:
+            return entries[(school, major)]['url']
+
+        bestScore, bestUrl = minScore, None
+
+        for (entrySchool, entryMajor), entry in entries.items():
+            schoolScore = getSchoolSimilarity(school, entrySchool)
+            if schoolScore < bestScore:
+                continue
+
+            score = min(schoolScore, getSimilarity(major, entryMajor))
+            if score >= bestScore:
+                bestScore, bestUrl = score, entry['url']
+
+        return bestUrl
+
+# Adds the URL of the faculty page of the major at the school, keeping it for later runs
+def learn(school, major, url):
+    key = getKey(school, major)
+
+    with lock:
+        loadEntries()
+
+        if key in entries and entries[key]['url'] == url:
+            return
+
+        entries[key] = { 'school' : school, 'major' : major, 'url' : url }
+
+        learned = readEntries(learnedPath)
+        learned = [entry for entry in learned if getKey(entry['school'], entry['major']) != key]
+        learned.append(entries[key])
+
+        writeEntries(learnedPath, learned)
+
+# Returns the normalized (school, major) of a query
+def getKey(school, major):
+    major = QueryUtil.normalizeName(major)
+    return (QueryUtil.normalizeName(school), majorAliases.get(major, major))
+
+# Returns how similar two normalized school names are, from 0 to 1
+# Every distinguishing word of each name must be close to a word of the other, so "university of california"
+# matches no campus of it, while words differing by a typo ("john" and "johns hopkins") are still close
+def getSchoolSimilarity(school, otherSchool):
+    if school == otherSchool:
+        return 1.0
+
+    words      = set(school.split()) - fillerWords
+    otherWords = set(otherSchool.split()) - fillerWords
+
+    if not words or not otherWords:
+        return 0.0
+
+    return min(getWordSimilarity(words, otherWords), getWordSimilarity(otherWords, words))
+
+# Returns how similar the least similar of the words is to its closest other word, from 0 to 1
+def getWordSimilarity(words, otherWords):
+    return min(max(difflib.SequenceMatcher(None, word, otherWord).ratio() for otherWord in otherWords) for word in words)
+
+# Returns how similar two normalized names (e.g. majors) are, from 0 to 1
+# Names are also compared with as many leading words of the longer one as the shorter one has,
+# so "john hopkins" is close to "johns hopkins university"
+def getSimilarity(name, otherName):
+    if name == otherName:
+        return 1.0
+
+    words, otherWords = name.split(), otherName.split()
+    numWords = min(len(words), len(otherWords))
+
+    return max(difflib.SequenceMatcher(None, name, otherName).ratio(),
+               difflib.SequenceMatcher(None, ' '.join(words[:numWords]), ' '.join(otherWords[:numWords])).ratio())
+
+# Loads the seed and learned entries if not loaded yet, learned entries replacing seed entries
+def loadEntries():
+    global entries
+
+    if entries is not None:
+        return
+
+    entries = dict()
+    for entry in readEntries(seedPath) + readEntries(learnedPath):
+        entries[getKey(entry['school'], entry['major'])] = entry
+
+# Returns the list of entries ({ 'school', 'major', 'url' } dictionaries) in a file (empty if there is no such file)
+def readEntries(path):
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (IOError, ValueError):
+        return []
+
+# Writes a list of entries to a file
+def writeEntries(path, newEntries):
+    directory = os.path.dirname(path)
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+
+    temp = path + '.' + str(threading.current_thread().ident) + '.tmp'
+    with open(temp, 'w') as f:
+        json.dump(newEntries, f, indent=2, sort_keys=True)
+    os.rename(temp, path)
@@ -0,0 +1,88 @@
+"""
+Size-bounded on-disk cache with least recently used eviction
+"""
+
+import os
+import threading
+
+# Directory of cached entries, one file per entry
+# The 'serializer' is a module such as 'json' or 'pickle' providing 'dumps' and 'loads'
+class DiskCache:
+
+    # Constructor
+    def __init__(self, directory, maxSize, serializer, extension):
+        self.directory = directory
+        self.maxSize = maxSize
+        self.serializer = serializer
+        self.extension = extension
+        self.size = None  # Computed lazily from the directory
+        self.lock = threading.Lock()
+
+    # Returns the entry for the given key, or None if not cached
+    def load(self, key):
+        path = self.path(key)
+        try:
+            with open(path, 'rb') as f:
+                entry = self.serializer.loads(f.read())
+            os.utime(path, None)  # Mark as recently used
+            return entry
+        except Exception:
+            return None
+
+    # Writes the entry for the given key, evicting old entries if needed
+    def store(self, key, entry):
+        path = self.path(key)
+        content = self.serializer.dumps(entry)
+
+        with self.lock:
+            if not os.path.isdir(self.directory):
+                os.makedirs(self.directory)
+
+            self.computeSize()
+            if os.path.exists(path):
+                self.size -= os.path.getsize(path)
+
+            temp = path + '.' + str(threading.current_thread().ident) + '.tmp'
+            with open(temp, 'wb') as f:
+                f.write(content)
+            os.rename(temp, path)
+
+            self.size += len(content)
+
+            if self.size > self.maxSize:
+                self.evict()
+
+    # Removes every entry whose key starts with the given prefix (every entry by default)
+    def clear(self, prefix=''):
+        with self.lock:
+            self.computeSize()
+            for name, path in self.entries():
+                if name.startswith(prefix):
+                    self.size -= os.path.getsize(path)
+                    os.remove(path)
+
+    # Removes least recently used entries until the cache fits in its size limit
+    def evict(self):
+        entries = [(os.path.getmtime(path), os.path.getsize(path), path) for name, path in self.entries()]
+        entries.sort()
+
+        for mtime, size, path in entries:
+            if self.size <= self.maxSize:
+                break
+            os.remove(path)
+            self.size -= size
+
+    # Computes the total size of the cache if not known yet
+    def computeSize(self):
+        if self.size is None:
+            self.size = sum(os.path.getsize(path) for name, path in self.entries())
+
+    # Returns (name, path) pairs of all entries
+    def entries(self):
+        if not os.path.isdir(self.directory):
+            return []
+        return [(name, os.path.join(self.directory, name)) for name in os.listdir(self.directory) if name.endswith(self.extension)]
+
+    # Returns the path of the file for the given key
+    def path(self, key):
+        return os.path.join(self.directory, key + self.extension)
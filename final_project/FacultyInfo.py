@@ -4,103 +4,304 @@ Scrapes school official website for a list of faculty members and their research
 
 import re
 import requests
+import HTMLParser
+import lxml.etree
+import HttpClient
 import json
 import QueryUtil
+import Profiler
+import ParsePool
+import Crawler
+import DepartmentDirectory
 
 from bs4 import BeautifulSoup
-from urlparse import urlparse
+
+# Number of candidate pages visited at the same time
+numWorkers = 8
+
+# Number of candidate pages of the same domain visited at the same time
+perDomain = 4
+
+# Seconds after which the search stops
+maxTime = 60
+
+# Number of faculty members after which the search stops (no limit if None)
+maxProfiles = None
+
+# Keywords of a sentence describing a faculty member
+descriptionKeywords = [ 'research', 'holds', 'received', 'area', 'director', 'member', 'fellow', 'earned' ]
+
+# Anchor texts (exact) and heading texts (partial) found on a faculty member's homepage
+linkKeywords    = [ 'teaching', 'teachings', 'publication', 'publications', 'cv', 'curriculum vitae' ]
+headingKeywords = [ 'research interest', 'areas of interest', 'publications', 'bio' ]
+
+# Elements whose text 'soup.text' leaves out
+hiddenTags = set([ 'script', 'style', 'template' ])
+
+# All keywords are looked for at once, each pattern being compiled into a single automaton
+# A description keyword is found at the last character of the word before it
+keywordPattern        = re.compile(r'(?=\S(\s+)(' + '|'.join(descriptionKeywords) + r')[^<])')
+headingKeywordPattern = re.compile('|'.join(re.escape(keyword) for keyword in headingKeywords))
+headingTagPattern     = re.compile(r'^h\d')
+tagPattern            = re.compile(r'<[/!?a-zA-Z][^>]*>')
+
+htmlParser = HTMLParser.HTMLParser()
 
 # The parameter 'query' is a dictionary of query information,
 # for example, { 'school' : 'Johns Hopkins', 'degree' : 'PhD' }
-def getResults(query):
+# Faculty members are printed as soon as their pages are confirmed
+def getResults(query, maxProfiles=maxProfiles):
+    counter = 0
+
+    for url, name, description in iterResults(query, maxProfiles, True):
+        counter = counter + 1
+        print str(counter) + '. ' + name
+        print description
+        print '\n'
+
+    if counter == 0:
+        print 'Could not find information...\n'
+
+# Generator of (url, name, description) of the faculty members of the query, as soon as their pages are confirmed
+# The faculty page searched and a timed out search are printed if 'doPrint' is set
+def iterResults(query, maxProfiles=maxProfiles, doPrint=False):
     school = query[QueryUtil.schoolKey]
     major = query[QueryUtil.majorKey]
 
-    # Search using Google
-
-    queryStr = school +  ' ' + major + ' faculty'
-    facultyLink = QueryUtil.google(queryStr)
+    # Look up the faculty page in the local directory, searching Google if it is not there
+    facultyLink = DepartmentDirectory.resolve(school, major)
 
     # Start scraping if a link to the faculty page has been found
+    if not facultyLink:
+        return
+
+    if doPrint:
+        print '\nSearching "' + facultyLink + '"\n'
+
+    # Candidate pages are visited concurrently, each URL once
+    crawler = Crawler.Crawler(visitCandidate, numWorkers, perDomain, maxTime, maxProfiles)
+
+    # Get all links within faculty page
+    try:
+        content = HttpClient.get(str(facultyLink), headers={'User-Agent': 'Mozilla/5.0'}, source='FacultyInfo')
+    except requests.RequestException:
+        content = ''
+    soup = QueryUtil.parseHtml(content, 'FacultyInfo')
+
+    # Remove header and footer since these are definitely not relevant
+    if soup.header:
+        soup.header.decompose()
+    if soup.footer:
+        soup.footer.decompose()
+
+    anchors = soup.find_all("a", href=True)
+
+    # Add each link that may lead to information about a faculty member
+    for anchor in anchors:
+        numWords = len(anchor.text.split())
+
+        # Minimum qualification for anchor text to match a faculty name
+        if len(anchor.text.strip()) == 0 or numWords < 2 or numWords > 3:
+            continue
+
+        # Handle relative URL
+        url = Crawler.normalizeUrl(anchor['href'], facultyLink)
+
+        # Check obvious bad URLs
+        if validUrl(url):
+            crawler.add(url, anchor.text)
 
     counter = 0
 
-    if facultyLink:
-        print '\nSearching "' + facultyLink + '"\n'
+    for url, name, description in crawler.crawl():
+        counter = counter + 1
+        yield (url, name, description)
 
-        # Get base URL to deal with relative URLs
-        domain = '{uri.scheme}://{uri.netloc}/'.format(uri=urlparse(facultyLink))
-
-        visitedUrls = dict() # Keeps track of visited urls
-
-        # Get all links within faculty page
-        content = requests.get(str(facultyLink), headers={'User-Agent': 'Mozilla/5.0'}).text
-        soup = BeautifulSoup(content, "lxml")
-
-        # Remove header and footer since these are definitely not relevant
-        if soup.header:
-            soup.header.decompose()
-        if soup.footer:
-            soup.footer.decompose()
-
-        anchors = soup.find_all("a", href=True)
-
-        if anchors:
-            # Visit each link to see if there is information about a faculty member
-            for anchor in anchors:
-                url = anchor['href']
-
-                numWords = len(anchor.text.split())
-
-                # Minimum qualification for anchor text to match a faculty name
-                if len(anchor.text.strip()) == 0 or numWords < 2 or numWords > 3:
-                    continue
-
-                # Handle relative URL
-                if url.startswith('/'):
-                    url = domain + url[1:] if domain.endswith('/') else domain + url
-
-                # Skip visited sites
-                if url in visitedUrls:
-                    continue
-
-                visitedUrls[url] = 0
-
-                # Check obvious bad URLs
-                if validUrl(url):
-                    try:
-                        # Visit link
-                        content = requests.get(url, headers={'User-Agent': 'Mozilla/5.0'}).text
-                        soup = BeautifulSoup(content, "lxml")
-
-                        # Remove header and footer since these are definitely not relevant
-                        if soup.header:
-                            soup.header.decompose()
-                        if soup.footer:
-                            soup.footer.decompose()
-
-                        # Check if this is a page related to faculty information
-                        if validContent(soup):
-                            matches = re.finditer(r'>(.+\S+\s+(research|holds|received|area|director|member|fellow|earned)[^<]+)', content)
-
-                            longestStr = None # Hack to avoid getting irrelevant short sentences containing above keywords.
-
-                            if matches:
-                                for match in matches:
-                                    matchStr = match.group(1)
-                                    if longestStr is None or len(longestStr) < len(matchStr):
-                                        if matchStr[0].isupper():
-                                            longestStr = matchStr
-                            if longestStr:
-                                counter = counter + 1
-                                print str(counter) + '. ' + anchor.text
-                                print removeTags(longestStr)
-                                print '\n'
-                    except:
-                        continue
+    if crawler.timedOut and doPrint:
+        print 'Stopped searching after ' + str(maxTime) + ' seconds\n'
 
-    if counter == 0:
-        print 'Could not find information...\n'
+    # Keep the page for later queries since it does list faculty members
+    if counter > 0:
+        DepartmentDirectory.learn(school, major, facultyLink)
+
+# Returns the description of the faculty member at the url, or None if it is not a faculty member's page
+# Parsing runs in the parse pool, so only the description comes back
+def visitCandidate(crawler, url, name):
+    content = HttpClient.get(url, headers={'User-Agent': 'Mozilla/5.0'}, source='FacultyInfo')
+
+    return ParsePool.apply(getFacultyDescription, content)
+
+# Returns the description of the faculty member if the HTML is a faculty member's page, or None
+def getFacultyDescription(content):
+    if QueryUtil.fastParse:
+        return extractFacultyDescription(content)
+
+    soup = QueryUtil.parseHtml(content, 'FacultyInfo')
+
+    # Remove header and footer since these are definitely not relevant
+    if soup.header:
+        soup.header.decompose()
+    if soup.footer:
+        soup.footer.decompose()
+
+    # Check if this is a page related to faculty information
+    if validContent(soup):
+        return getDescription(content)
+
+    return None
+
+# Returns the sentence of a faculty page that most likely describes the faculty member, or None
+@Profiler.timed('FacultyInfo', 'extract')
+def getDescription(content):
+    matches = re.finditer(r'>(.+\S+\s+(' + '|'.join(descriptionKeywords) + r')[^<]+)', content)
+
+    longestStr = None # Hack to avoid getting irrelevant short sentences containing above keywords.
+
+    if matches:
+        for match in matches:
+            matchStr = match.group(1)
+            if longestStr is None or len(longestStr) < len(matchStr):
+                if matchStr[0].isupper():
+                    longestStr = matchStr
+
+    return removeTags(longestStr) if longestStr else None
+
+# Same as 'getFacultyDescription', classifying the page in one walk of an lxml tree
+# and finding the description in one scan of the HTML without parsing fragments
+def extractFacultyDescription(content):
+    tree = QueryUtil.parseTree(content, 'FacultyInfo')
+
+    if tree is None:
+        return None
+
+    with Profiler.stage('FacultyInfo', 'extract', len(content)):
+        if isFacultyPage(tree):
+            return findDescription(content)
+
+    return None
+
+# Same as 'validContent' on the page without its first header and footer, in a single walk of the tree
+def isFacultyPage(tree):
+    texts = list()          # Text of the page
+    anchorTexts = list()    # Text of each anchor with a link
+    headingTexts = list()   # Text of each heading
+    collecting = list()     # (element, texts) of anchors and headings being walked
+
+    headerRemoved = False
+    footerRemoved = False
+
+    walker = lxml.etree.iterwalk(tree, events=('start', 'end', 'comment', 'pi'))
+
+    for event, element in walker:
+        tag = element.tag
+
+        # Comments and processing instructions are not part of the text, but what follows them is
+        if event in ('comment', 'pi'):
+            addText(element.tail, texts, collecting)
+            continue
+
+        if event == 'start':
+            if not isinstance(tag, basestring):
+                continue
+
+            # Like 'soup.text', leave out scripts, styles and templates (their tail is added at their end)
+            if tag in hiddenTags:
+                walker.skip_subtree()
+                continue
+
+            if tag == 'header' and not headerRemoved:
+                headerRemoved = True
+                walker.skip_subtree()
+                continue
+
+            if tag == 'footer' and not footerRemoved:
+                footerRemoved = True
+                # The first header is removed along with the footer if it is inside it
+                if not headerRemoved and element.find('.//header') is not None:
+                    headerRemoved = True
+                walker.skip_subtree()
+                continue
+
+            if tag == 'a' and 'href' in element.attrib:
+                anchorTexts.append(list())
+                collecting.append((element, anchorTexts[-1]))
+            elif headingTagPattern.search(tag):
+                headingTexts.append(list())
+                collecting.append((element, headingTexts[-1]))
+
+            addText(element.text, texts, collecting)
+        else:
+            if collecting and collecting[-1][0] is element:
+                collecting.pop()
+
+            addText(element.tail, texts, collecting)
+
+    if not 'Professor' in u''.join(texts):
+        return False
+
+    for anchorText in anchorTexts:
+        if u''.join(anchorText).lower().strip() in linkKeywords:
+            return True
+
+    for headingText in headingTexts:
+        if headingKeywordPattern.search(u''.join(headingText).lower()):
+            return True
+
+    return False
+
+# Adds a piece of text to the text of the page and of the anchors and headings it is in
+def addText(text, texts, collecting):
+    if text:
+        texts.append(text)
+        for element, elementTexts in collecting:
+            elementTexts.append(text)
+
+# Same as 'getDescription' in time linear to the length of the HTML
+# Like the regular expression there, a match starts after the first '>' on the line of a keyword (at least two
+# characters before the word preceding it), covers the last keyword on that line and ends before the next '<'
+def findDescription(content):
+    candidates = [ (match.start(), match.end(2)) for match in keywordPattern.finditer(content) ]
+
+    longestStr = None
+    position = 0
+    i = 0
+
+    while i < len(candidates):
+        anchor, keywordEnd = candidates[i]
+
+        if anchor < position + 2:
+            i += 1
+            continue
+
+        lineStart = content.rfind('\n', 0, anchor) + 1
+        start = content.find('>', max(position, lineStart), anchor - 1)
+
+        if start == -1:
+            i += 1
+            continue
+
+        lineEnd = content.find('\n', anchor)
+        if lineEnd == -1:
+            lineEnd = len(content)
+
+        # Skip to the last keyword on the line
+        while i + 1 < len(candidates) and candidates[i + 1][0] < lineEnd:
+            i += 1
+            anchor, keywordEnd = candidates[i]
+
+        end = content.find('<', keywordEnd)
+        if end == -1:
+            end = len(content)
+
+        matchStr = content[start + 1:end]
+        if longestStr is None or len(longestStr) < len(matchStr):
+            if matchStr[0].isupper():
+                longestStr = matchStr
+
+        position = end
+        i += 1
+
+    return stripTags(longestStr) if longestStr else None
 
 # Pre-screening of URLs that definitely would not contain information about faculty member
 def validUrl(url):
@@ -111,6 +312,7 @@ def validUrl(url):
     return True
 
 # Check if the content contains certain keywords related to faculty member's homepage
+@Profiler.timed('FacultyInfo', 'extract')
 def validContent(soup):
     if not 'Professor' in soup.text:
         return False
@@ -119,7 +321,7 @@ def validContent(soup):
 
     if anchors:
         for anchor in anchors:
-            for keyword in [ 'teaching', 'teachings', 'publication', 'publications', 'cv', 'curriculum vitae' ]:
+            for keyword in linkKeywords:
                 if keyword == anchor.text.lower().strip():
                     return True
 
@@ -127,7 +329,7 @@ def validContent(soup):
 
     if headings:
         for heading in headings:
-            for keyword in [ 'research interest', 'areas of interest', 'publications', 'bio' ]:
+            for keyword in headingKeywords:
                 if keyword in heading.text.lower():
                     return True
 
@@ -138,4 +340,11 @@ def removeTags(str):
     soup = BeautifulSoup('<p>' + str + '<p>', "lxml")
     for tag in soup.find_all(True):
         tag.replaceWith(tag.text)
-    return soup.renderContents()
\ No newline at end of file
+    return soup.renderContents()
+
+# Same as 'removeTags' without parsing the string
+def stripTags(html):
+    if isinstance(html, bytes):
+        html = html.decode('utf-8')
+    text = htmlParser.unescape(tagPattern.sub('', html))
+    return text.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;').encode('utf-8')
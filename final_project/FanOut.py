@@ -0,0 +1,98 @@
+"""
+Runs the sources of a query (e.g. GradCafe and GoHackers) at the same time.
+
+Each source runs on its own thread and is handed back as soon as it finishes, so the
+caller can show it while the others are still running. Sources that return a generator
+are read item by item, so those still running at the deadline are handed back with the
+results read so far.
+"""
+
+import Queue
+import threading
+import time
+import traceback
+import types
+
+# Seconds to wait for every source before handing back what there is
+maxTime = 120
+
+# Raised by a source whose results have gaps (e.g. a page could not be fetched)
+# The source is handed back with the results read so far and 'finished' unset
+class IncompleteError(Exception):
+    pass
+
+# A source of a query and what it returned
+class Source:
+
+    # Constructor
+    def __init__(self, name, function):
+        self.name = name
+        self.function = function
+        self.results = None     # Return value of the function (a list if it returned a generator)
+        self.finished = False   # Whether the function returned before the deadline
+        self.error = None       # Exception raised by the function, if any
+
+    # Runs the function and hands the source to 'done', reading generators until 'stopped' is set
+    def run(self, done, stopped):
+        try:
+            results = self.function()
+
+            if isinstance(results, types.GeneratorType):
+                self.results = list()
+
+                try:
+                    for result in results:
+                        self.results.append(result)
+                        if stopped.is_set():
+                            return
+                finally:
+                    results.close()
+            else:
+                self.results = results
+
+            self.finished = True
+        except IncompleteError as e:
+            self.error = e
+        except Exception as e:
+            self.error = e
+            traceback.print_exc()
+        finally:
+            done.put(self)
+
+# Generator of the sources in the order they finish, followed by those still running after
+# 'maxTime' seconds (no limit if None) with 'finished' unset and the results read so far
+# The parameter 'sources' is a list of (name, function) pairs
+def run(sources, maxTime=maxTime):
+    deadline = time.time() + maxTime if maxTime is not None else None
+
+    sources = [Source(name, function) for name, function in sources]
+    done = Queue.Queue()
+    stopped = threading.Event()
+
+    for source in sources:
+        thread = threading.Thread(target=source.run, args=(done, stopped))
+        thread.daemon = True
+        thread.start()
+
+    remaining = list(sources)
+
+    try:
+        while remaining:
+            if deadline is not None and time.time() >= deadline:
+                break
+
+            # Wait in short steps so that Ctrl-C still works
+            try:
+                source = done.get(timeout=0.1)
+            except Queue.Empty:
+                continue
+
+            remaining.remove(source)
+            yield source
+    finally:
+        stopped.set()
+
+    for source in remaining:
+        if isinstance(source.results, list):
+            source.results = list(source.results)
+        yield source
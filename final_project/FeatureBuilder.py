@@ -0,0 +1,44 @@
+"""
+Builds the feature matrix for machine learning from scraped admission results
+"""
+
+import itertools
+import numpy as np
+import QueryUtil
+
+# Column order of the feature matrix (the last column is the label)
+columns = [QueryUtil.gpaScore, QueryUtil.greVerbal, QueryUtil.greQuant, QueryUtil.greWriting,
+           QueryUtil.workExp, QueryUtil.research, QueryUtil.status, QueryUtil.decision]
+
+# Number of results converted at a time when building a matrix
+chunkSize = 1000
+
+# Returns a matrix with one row per valid result from all given lists or generators of 'AdmissionRecord's
+# (e.g. outputs of 'GradCafe.getResults' and 'GoHackers.iterResults'). Results are consumed
+# 'chunkSize' at a time, so only the numeric rows are kept while a stream is being read
+def buildMatrix(*resultStreams):
+    results = itertools.chain(*resultStreams)
+    chunks = list()
+
+    while True:
+        chunk = list(itertools.islice(results, chunkSize))
+        if not chunk:
+            break
+        chunks.append(buildChunk(chunk))
+
+    if not chunks:
+        return np.empty(shape=(0, len(columns)), dtype=np.float)
+
+    return np.vstack(chunks)
+
+# Returns a matrix with one row per valid result in the list of 'AdmissionRecord's
+def buildChunk(records):
+    data = np.array([record.getFeatures() for record in records], dtype=np.float).reshape((-1, len(columns)))
+
+    data[:,1] = QueryUtil.normalizeGreArray(data[:,1])
+    data[:,2] = QueryUtil.normalizeGreArray(data[:,2])
+
+    # Reject rows with missing or invalid scores
+    valid = (data[:,0] > 0) & (data[:,0] <= 1) & (data[:,1] > 0) & (data[:,2] > 0) & (data[:,3] > 0)
+
+    return data[valid]
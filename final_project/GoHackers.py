@@ -4,56 +4,154 @@ Scrapes http://www.gohackers.com/ for admission results
 from __future__ import print_function
 import re
 import requests
+import HttpClient
 import QueryUtil
-from bs4 import BeautifulSoup
+import Profiler
+import AdmissionRecord
+import ParsePool
+import FanOut
+import SessionCache
 import pandas
 import threading
+import Queue
 
+# Number of threads fetching posts at the same time
+numWorkers = 8
+
+# Site to scrape (can be pointed at a stand-in server, see 'StandInServer.py')
+baseUrl = "http://www.gohackers.com"
+
+# IDs of the cells of a post that are read: accepted schools, GPA, GRE scores and experience
+postCells = ["content_1", "content_4", "content_5", "content_7"]
+
+# Patterns of the scores and the post ID
+grePattern = re.compile("[A-Z]*([0-9]{3})[\/\s]*[A-Z]*([0-9]{3})[\/\s]*[A-Z]*([0-9].[0-9])")
+gpaPattern = re.compile("[0-9].[0-9][0-9]?\/[0-9].[0-9][0-9]?")
+uidPattern = re.compile("uid=([0-9]+)")
 
 ########################################################################################################################
 # The parameter 'query' is a dictionary of query information,
 # for example, { 'school' : 'Johns Hopkins', 'degree' : 'PhD' }
 # This function inputs a query with format specified as above and boolean value doPrint as an indicator to print or not
-# and reuturns the list of results in dictionary format with keys that are written in QueyUtil.py
-# for example, { 'decision': 1, 'greVerbal': 500, 'greQuant': 700, 'greWriting': 4.0, 'gpaScore':3.5/4.0 and etc}
+# and reuturns the list of results as AdmissionRecords with fields named after the keys in QueyUtil.py
+# for example, decision=1, greVerbal=500.0, greQuant=700.0, greWriting=4.0, gpaScore=3.5, gpaScale=4.0 and etc
 ########################################################################################################################
-def getResults(query, doPrint) :
-    # Base url
-    base_url = "http://www.gohackers.com"
+def getResults(query, doPrint, numWorkers=numWorkers) :
+    scraped = scrapeResults(query, doPrint, numWorkers)
 
-    # Construct URL with query parameters
-    url = "http://www.gohackers.com/?r=gohackers&c=prepare/prepare_info/admission&m=bbs&bid=admission&sort=gid&orderby=asc&where=subject|content&degree=%EB%8C%80%ED%95%99%EC%9B%90&keyword="
-    if query[QueryUtil.degreeKey].lower() is "phd" :
-        url = url + query[QueryUtil.schoolKey].lower() + "%26%26" + query[QueryUtil.majorKey].lower() + "%26%26ph.d"
-    else :
-        url = url + query[QueryUtil.schoolKey].lower() + "%26%26" + query[QueryUtil.majorKey].lower() + "%26%26" + query[QueryUtil.degreeKey].lower()
+    if doPrint :
+        showResults(scraped)
 
+    return scraped[0]
 
+# Returns (results, number of posts on each listing page) for the query without printing them.
+# Only the first listing page is read if doPrint is set
+def scrapeResults(query, doPrint, numWorkers=numWorkers) :
+    # Construct URL with query parameters
+    url = getSearchUrl(query)
 
     # Initialize tot_page that indicates total pages
     tot_pages = 1
 
     # If not need to print, get actual total number of pages
     if not doPrint :
-        tot_pages = getTotalPageNum(url)
+        try :
+            tot_pages = getTotalPageNum(url)
+        except requests.RequestException as ex :
+            print ("Cannot get the total number of posts")
+            tot_pages = 0
+
+    # Give different limit of number of posts to check depending on doPrint flag
+    recnum = 15 if doPrint else 70
 
     # A list to store result from each post
     results = list()
 
-    # A list of active threads
-    threads = list()
+    # Number of posts on each listing page
+    pageCounts = list()
 
-    for i in range (1, tot_pages+1) :
-        if doPrint :                         # Update page number until it searches all pages
-            url += "&recnum=15&p=" + str(i)  # Also give different limit of number of posts to check
-        else :                               # depending on doPrint flag
-            url += "&recnum=70&p=" + str(i)
+    fetchResults(listPosts(url, tot_pages, recnum, pageCounts), query[QueryUtil.schoolKey].lower(), results, numWorkers)
+
+    return (results, pageCounts)
+
+# Prints the results returned by scrapeResults
+def showResults(scraped) :
+    results, pageCounts = scraped
+
+    for count in pageCounts :
+        print("Total : " + str(count) + " posts")
+
+    if len(results) > 0 :
+        # Print results neatly
+        printResults(results)
+    else :
+        print ("Could not find any result that matches to given query.")
+
+########################################################################################################################
+# Generator of the results of posts that are newer than every post whose ID is in 'knownIds',
+# yielding each result as soon as its post is parsed.
+# The listing is newest-first and stops at the first known post, so the cost
+# depends on the number of new posts only.
+# Raises 'FanOut.IncompleteError' once the results are read if a listing page or a post could not be read,
+# since posts past it would be skipped by the next sync once the results read so far are stored
+# The total number of posts is printed if doPrint is set
+########################################################################################################################
+def iterNewResults(query, knownIds, numWorkers=numWorkers, doPrint=True) :
+    url = getSearchUrl(query)
+
+    try :
+        tot_pages = getTotalPageNum(url, doPrint)
+    except requests.RequestException as ex :
+        print ("Cannot get the total number of posts")
+        tot_pages = 0
+
+    return streamResults(listNewPosts(url, tot_pages, knownIds), query[QueryUtil.schoolKey].lower(), numWorkers, True)
+
+# Generator of the results of every post for the query (like getResults without printing),
+# yielding each result as soon as its post is parsed
+def iterResults(query, numWorkers=numWorkers) :
+    url = getSearchUrl(query)
 
-        # Get post subjects
-        post_subjects = getPostSubjects(url)
+    try :
+        tot_pages = getTotalPageNum(url)
+    except requests.RequestException as ex :
+        print ("Cannot get the total number of posts")
+        tot_pages = 0
+
+    return streamResults(listPosts(url, tot_pages, 70), query[QueryUtil.schoolKey].lower(), numWorkers)
+
+# Returns the URL of the search results for the query
+# The board lists posts newest-first with "orderby=asc" (new posts get a lower gid) and the
+# first row is numbered with the total number of posts
+def getSearchUrl(query) :
+    url = baseUrl + "/?r=gohackers&c=prepare/prepare_info/admission&m=bbs&bid=admission&sort=gid&orderby=asc&where=subject|content&degree=%EB%8C%80%ED%95%99%EC%9B%90&keyword="
+    if query[QueryUtil.degreeKey].lower() is "phd" :
+        url = url + query[QueryUtil.schoolKey].lower() + "%26%26" + query[QueryUtil.majorKey].lower() + "%26%26ph.d"
+    else :
+        url = url + query[QueryUtil.schoolKey].lower() + "%26%26" + query[QueryUtil.majorKey].lower() + "%26%26" + query[QueryUtil.degreeKey].lower()
 
-        if doPrint :
-            print("Total : " + str(len(post_subjects)-5) + " posts")
+    return url
+
+#####################################################################################
+# Generator of the URLs of every post on listing pages 1 to tot_pages.
+# Each listing page is only fetched once the posts of the previous one are taken.
+# The number of posts on each page is added to pageCounts if it is given.
+# A page that cannot be fetched is skipped if skipFailed is set, otherwise the
+# exception is raised.
+#####################################################################################
+def listPosts(url, tot_pages, recnum, pageCounts=None, skipFailed=True) :
+    for i in range (1, tot_pages+1) :
+        # Get post subjects (skip the page and keep partial results if it cannot be fetched)
+        try :
+            post_subjects = getPostSubjects(url + "&recnum=" + str(recnum) + "&p=" + str(i))
+        except requests.RequestException as ex :
+            print ("Cannot get page " + str(i))
+            if not skipFailed :
+                raise
+            continue
+
+        if pageCounts is not None :
+            pageCounts.append(len(post_subjects)-5)
 
         # Get result from each post in one page
         for subject in post_subjects :
@@ -61,28 +159,71 @@ def getResults(query, doPrint) :
             # Check if the post is a Notice or Ads
             if subject.a.b == None :
                 a = subject.find("a", href=True)
+                yield baseUrl+a['href']
 
-                # Get Result from each post
-                thread = threading.Thread(target=getResult, args=(base_url+a['href'], query[QueryUtil.schoolKey].lower(), results))
-                threads.append(thread)
-    print
+# Generator of the URLs of posts listed before the first post whose ID is in 'knownIds'
+def listNewPosts(url, tot_pages, knownIds) :
+    for postUrl in listPosts(url, tot_pages, 70, skipFailed=False) :
+        if getPostId(postUrl) in knownIds :
+            return
+        yield postUrl
 
-    # Start each thread
-    for thread in threads:
-        thread.start()
-
-    # Wait for each thread to finish
-    for thread in threads:
-        thread.join()
+#####################################################################################
+# Fetches the result of every post in 'postUrls' into 'results'.
+# A fixed number of workers fetch posts while listing pages are still loading.
+#####################################################################################
+def fetchResults(postUrls, schoolName, results, numWorkers) :
+    results.extend(streamResults(postUrls, schoolName, numWorkers))
 
-    if doPrint:
-        if len(results) > 0 :
-            # Print results neatly
-            printResults(results)
-        else :
-            print ("Could not find any result that matches to given query.")
+#####################################################################################
+# Generator of the result of every post in 'postUrls', in the order they are parsed.
+# Listing pages are read on a background thread and a fixed number of workers fetch
+# posts, so fetching carries on while the caller consumes results. Both queues are
+# bounded, so neither listing nor fetching runs far ahead of the caller.
+# Posts that cannot be listed or fetched are skipped, unless 'complete' is set, in
+# which case FanOut.IncompleteError is raised after the other results.
+#####################################################################################
+def streamResults(postUrls, schoolName, numWorkers=numWorkers, complete=False) :
+    # Post URLs waiting to be fetched and results waiting to be consumed
+    posts = Queue.Queue(maxsize=4*numWorkers)
+    output = Queue.Queue(maxsize=4*numWorkers)
+
+    # Set when the caller stops consuming results, and when a post cannot be listed or fetched
+    stopped = threading.Event()
+    failed = threading.Event()
+
+    lister = threading.Thread(target=queuePosts, args=(postUrls, posts, numWorkers, stopped, failed))
+    lister.daemon = True
+    lister.start()
+
+    workers = list()
+    for i in range(numWorkers) :
+        worker = threading.Thread(target=fetchPosts, args=(posts, schoolName, output, stopped, failed))
+        worker.daemon = True
+        worker.start()
+        workers.append(worker)
 
-    return results
+    try :
+        # Each worker puts None once it is done
+        numDone = 0
+        while numDone < numWorkers :
+            result = output.get()
+            if result is None :
+                numDone += 1
+            else :
+                yield result
+
+        if complete and failed.is_set() :
+            raise FanOut.IncompleteError("Could not read every GoHackers post")
+    finally :
+        stopped.set()
+
+        # Unblock workers waiting to hand over results nobody will consume
+        while any(worker.is_alive() for worker in workers) :
+            try :
+                output.get(timeout=0.1)
+            except Queue.Empty :
+                pass
 
 def printResults(results) :
     print ("     GPA      GRE        Decision  St1   Research   WorkExp")
@@ -90,14 +231,14 @@ def printResults(results) :
     for result in results :
         print (str(count), end = "")
         print ("   " if count < 10 else "  ", end = "")
-        print (result['gpaScore'][0:4] if result['gpaScore']>0 else "   0", end = "  ")
-        print (str(result['greVerbal']) if result['greVerbal'] > 0 else " 0 ", end = "/")
-        print (str(result['greQuant']) if result['greQuant'] > 0 else " 0 ", end = "/")
-        print (str(result['greWriting']) if result['greWriting'] > 0 else " 0 ", end = "    ")
-        print ("Accepted" if result['decision'] else "Rejected", end = "  ")
+        print ("{:.2f}".format(result.gpaScore) if result.gpaScore > 0 else "   0", end = "  ")
+        print ("{:.0f}".format(result.greVerbal) if result.greVerbal > 0 else " 0 ", end = "/")
+        print ("{:.0f}".format(result.greQuant) if result.greQuant > 0 else " 0 ", end = "/")
+        print ("{:.1f}".format(result.greWriting) if result.greWriting > 0 else " 0 ", end = "    ")
+        print ("Accepted" if result.decision else "Rejected", end = "  ")
         print (" I ", end = "     ")
-        print (" True" if result['research'] else "False", end = "     ")
-        print (" True" if result['workExp'] else "False", end = "\n")
+        print (" True" if result.research else "False", end = "     ")
+        print (" True" if result.workExp else "False", end = "\n")
         count += 1
 
 
@@ -107,41 +248,83 @@ def printResults(results) :
 # and returns the results from its post such as
 # "decision(accepted/rejected)", "GRE or Test Scores", and etc.
 ###############################################################
-def getResult(url, schoolName, results) :
+# The post is fetched on the calling thread and parsed in the parse pool (see 'ParsePool')
+# Posts read earlier in the session for the same school are taken from SessionCache
+def fetchResult(url, schoolName) :
+    key = ('GoHackers', ' '.join(schoolName.lower().split()), getPostId(url) or url)
+
+    result = SessionCache.get(key)
+    if result is not None :
+        return result
 
     # Get HTML result form a post
-    html_content = requests.get(url).text
-    soup = BeautifulSoup(html_content, "lxml")
+    html_content = HttpClient.get(url, source='GoHackers')
 
-    header = [QueryUtil.decision, QueryUtil.greVerbal, QueryUtil.greQuant, QueryUtil.greWriting, QueryUtil.gpaScore, QueryUtil.workExp, QueryUtil.research, QueryUtil.status, QueryUtil.postId]
-    result = {}
+    result = ParsePool.apply(parseResult, html_content, url, schoolName)
+    SessionCache.put(key, result)
 
-    # Initialize the values in result to 0
-    for key in range(len(header)-2) :
-        result[header[key]] = 0
+    return result
 
-    # Initialize the value for Applicant Status to 1 (International Student)
-    result[header[len(header)-2]]= 1
+###############################################################
+# Helper function for fetchResult.
+# This function requires the HTML of a post and its url
+# and returns the result of the post as an AdmissionRecord.
+###############################################################
+def parseResult(html_content, url, schoolName) :
+    if QueryUtil.fastParse :
+        tree = QueryUtil.parseTree(html_content, 'GoHackers')
+        with Profiler.stage('GoHackers', 'extract') :
+            return extractResult(getCellTextsFast(tree), url, schoolName)
+
+    soup = QueryUtil.parseHtml(html_content, 'GoHackers')
+    with Profiler.stage('GoHackers', 'extract') :
+        return extractResult(getCellTexts(soup), url, schoolName)
+
+# Returns the text of each cell in postCells of the parsed HTML of a post (None if there is no such cell)
+def getCellTexts(soup) :
+    cells = dict()
+    for cellId in postCells :
+        cell = soup.find("td", id=cellId)
+        cells[cellId] = cell.text if cell else None
+    return cells
+
+# Same as getCellTexts, for an lxml tree of a post
+def getCellTextsFast(tree) :
+    cells = dict()
+    for cellId in postCells :
+        found = tree.xpath('//td[@id=$cellId]', cellId=cellId) if tree is not None else []
+        cells[cellId] = found[0].text_content() if found else None
+    return cells
+
+###############################################################
+# Helper function for parseResult.
+# This function requires the texts of the cells of a post
+# (see getCellTexts) and its url and returns the result of
+# the post as an AdmissionRecord, with scores parsed into
+# numbers.
+###############################################################
+def extractResult(cells, url, schoolName) :
+    # Every applicant on GoHackers is an international student
+    result = AdmissionRecord.AdmissionRecord(status=1)
 
     # Check if school name is listed on the acceptance list
     try :
-        if (schoolName in soup.find("td",id="content_1").text.encode("utf-8","ignore").lower()) :
-            result[header[0]] = 1
+        if (schoolName in cells["content_1"].encode("utf-8","ignore").lower()) :
+            result.decision = 1
     except Exception as ex :
         print( "Cannot find Acceptance List" )
 
     try :
         # Get gre scores
-        testScores = soup.find("td",id="content_5").text
+        testScores = cells["content_5"]
         # print testScores.encode("utf-8","ignore")
 
-        regex = re.compile("[A-Z]*([0-9]{3})[\/\s]*[A-Z]*([0-9]{3})[\/\s]*[A-Z]*([0-9].[0-9])")
-        match = re.search(regex,testScores)
+        match = grePattern.search(testScores)
 
         if match :
-            result[header[1]] = match.group(1)
-            result[header[2]] = match.group(2)
-            result[header[3]] = match.group(3)
+            result.greVerbal  = AdmissionRecord.parseScore(match.group(1))
+            result.greQuant   = AdmissionRecord.parseScore(match.group(2))
+            result.greWriting = AdmissionRecord.parseScore(match.group(3))
         else :
             "=============== Cannot Find GRE Schores ==============="
     except Exception as ex :
@@ -149,15 +332,14 @@ def getResult(url, schoolName, results) :
 
     # Get GPA
     try :
-        gpaScore = soup.find("td", id="content_4").text
+        gpaScore = cells["content_4"]
         # print gpaScore.encode("utf-8","ignore")
 
         # searches for the gpa format from the text
-        regex = re.compile("[0-9].[0-9][0-9]?\/[0-9].[0-9][0-9]?")
-        match = re.search(regex, gpaScore)
+        match = gpaPattern.search(gpaScore)
 
         if match :
-            result[header[4]] = match.group(0)
+            result.gpaScore, result.gpaScale = AdmissionRecord.parseGpa(match.group(0))
         else :
             "=============== Cannot find GPA ================"
     except Exception as ex :
@@ -165,7 +347,7 @@ def getResult(url, schoolName, results) :
 
     # Get Work and Research experience
     try :
-        exp = soup.find("td", id="content_7").text
+        exp = cells["content_7"]
         # print exp.encode("utf-8","ignore")
 
         # check if the text has word "intern" in Korean
@@ -175,29 +357,76 @@ def getResult(url, schoolName, results) :
 
         if wrkMatch :
             # print wrkMatch.group()
-            result[header[5]] = 1
+            result.workExp = 1
 
         if resMatch :
             # print resMatch.group()
-            result[header[6]] = 1
+            result.research = 1
     except Exception as ex :
         print ("Cannot find experiences")
 
     # Store the post ID
+    result.postId = getPostId(url)
+
+    if result.postId is None :
+        print ("Cannot get the UID")
+
+    return result
+
+#####################################################################################
+# Lister for streamResults.
+# This function hands each post URL over to the workers, then tells each of them
+# to stop once the remaining posts are done.
+#####################################################################################
+def queuePosts(postUrls, posts, numWorkers, stopped, failed) :
     try :
-        gid_regex = re.search("uid=([0-9]+)", url)
-        result[header[8]] = gid_regex.group(1)
+        for postUrl in postUrls :
+            if stopped.is_set() :
+                break
+            posts.put(postUrl)
     except Exception as ex :
-        print ("Cannot get the UID")
+        print ("Cannot list the posts")
+        failed.set()
+    finally :
+        for i in range(numWorkers) :
+            posts.put(None)
+
+#####################################################################################
+# Worker for streamResults.
+# This function takes post URLs from the queue and puts the result of each of them
+# into 'output' until it receives None, then puts None itself. 'failed' is set
+# if a post cannot be fetched.
+#####################################################################################
+def fetchPosts(posts, schoolName, output, stopped, failed) :
+    while True :
+        url = posts.get()
+        if url is None :
+            break
+
+        # Keep taking posts so the lister can finish, but skip them once the caller stopped
+        if stopped.is_set() :
+            continue
+
+        try :
+            output.put(fetchResult(url, schoolName))
+        except Exception as ex :
+            print ("Cannot get the post " + url)
+            failed.set()
+
+    output.put(None)
 
-    results.append(result)
+# Returns the post ID (uid) in the given post URL, or None if there is none
+def getPostId(url) :
+    gid_regex = uidPattern.search(url)
+    return gid_regex.group(1) if gid_regex else None
 
 #####################################################################################
 # Helper function for getResults.
 # This function requires a url and computes the total number of pages that can cover
-# the entire list of results that was retrieved.
+# the entire list of results that was retrieved. The total number of posts is
+# printed if doPrint is set.
 #####################################################################################
-def getTotalPageNum(url) :
+def getTotalPageNum(url, doPrint=True) :
     url += "&recnum=1"
     post_subjects = getPostSubjects(url)
 
@@ -207,7 +436,8 @@ def getTotalPageNum(url) :
         if subject.a.b == None :
             tr_tag = subject.parent
             tot_num = int(tr_tag.find("td").text)
-            print ("Total : " + str(tot_num) + " posts")
+            if doPrint :
+                print ("Total : " + str(tot_num) + " posts")
             break
 
     tot_pages = tot_num / 70
@@ -224,8 +454,8 @@ def getTotalPageNum(url) :
 #################################################################################
 def getPostSubjects(url) :
     # Get HTML Text
-    html_content = requests.get(url).text
-    soup = BeautifulSoup(html_content, "lxml")
+    html_content = HttpClient.get(url, source='GoHackers')
+    soup = QueryUtil.parseHtml(html_content, 'GoHackers')
 
     # Start scraping posts by searching for subjects
     post_subjects = soup.find_all("td", class_="sbj")
@@ -1,57 +1,73 @@
 """
 Scrapes http://thegradcafe.com/ for admission results
 """
+import functools
+import hashlib
 import re
 import requests
+import HttpClient
 import pandas
 import QueryUtil
+import Profiler
+import ParsePool
+import FanOut
+import SessionCache
 
-from bs4 import BeautifulSoup
+from AdmissionRecord import AdmissionRecord
 
-# The parameter 'query' is a dictionary of query information,
-# for example, { 'school' : 'Johns Hopkins', 'degree' : 'PhD' }
-def getResults(query, doPrint):
-    school = query[QueryUtil.schoolKey]
-    major  = query[QueryUtil.majorKey]
-    degree = query[QueryUtil.degreeKey]
+from multiprocessing.pool import ThreadPool
 
-    numResults = 100 if doPrint else 250
+# Number of pages fetched at the same time
+numWorkers = 8
 
-    # Construct URL with query parameters
-    queryStr = re.sub(r"\s+", '+', school + " " + major)
-    url = "http://thegradcafe.com/survey/index.php?q=" + queryStr + "&t=a&o=&pp=" + str(numResults)
+# Site to scrape (can be pointed at a stand-in server, see 'StandInServer.py')
+baseUrl = "http://thegradcafe.com"
 
-    # Get HTML result
-    html_content = requests.get(url, headers={'User-Agent': 'Mozilla/5.0'}).text
-    soup = BeautifulSoup(html_content, "lxml")
+# Patterns of the scores of a result
+gpaPattern      = re.compile(r'.*GPA.*\s([0-9]\.[0-9]{2}).*')
+greInfoPattern  = re.compile(r'.*GRE\s+General.+([0-9]{3}\/[0-9]{3}\/[0-9.]+).*')
+greScorePattern = re.compile(r'([0-9]+)/([0-9]+)/([0-9.]+)')
 
-    # Find total number of pages
-    div = soup.find("div", {"class": "pagination"})
-    anchors = div.find_all("a", href=True)
-    numPages = len(anchors) + 1
+# The parameter 'query' is a dictionary of query information,
+# for example, { 'school' : 'Johns Hopkins', 'degree' : 'PhD' }
+def getResults(query, doPrint, numWorkers=numWorkers):
+    scraped = scrapeResults(query, doPrint, numWorkers)
 
-    # Start scraping data from table
+    showResults(scraped, doPrint)
 
-    header   = list()
-    results  = list()
-    features = list()  # Vectors to be used for machine learning
+    return scraped[0] if scraped else list()
 
-    # Get results for first page
-    getResult(degree, features, header, results, soup, doPrint, True)
+# Returns (feature vectors, display header, display rows) of the results for the query without printing them,
+# or None if GradCafe could not be reached. Only the first page is read if 'doPrint' is set
+def scrapeResults(query, doPrint, numWorkers=numWorkers):
+    numResults = 100 if doPrint else 250
 
-    currentPage = numPages + 1 if doPrint else 2
+    # Start scraping data from table, along with the total number of pages
+    # 'features' are vectors to be used for machine learning, 'results' are rows for display
+    firstPage = getParsedPage(query, numResults, 1)
+
+    if firstPage is None:
+        return None
+
+    # Pages are shared with the session cache, so they are copied before being extended
+    features, header, results, numPages = list(firstPage[0]), firstPage[1], list(firstPage[2]), firstPage[3]
 
     # Get results for next pages
-    while currentPage <= numPages:
-        url = "http://thegradcafe.com/survey/index.php?q=" + queryStr + "&t=a&pp=" + str(numResults) + "&o=&p=" + str(currentPage)
+    pages = range(numPages + 1 if doPrint else 2, numPages + 1)
 
-        # Get HTML result
-        html_content = requests.get(url, headers={'User-Agent': 'Mozilla/5.0'}).text
-        soup = BeautifulSoup(html_content, "lxml")
+    for pageFeatures, pageResults in iterPages(query, numResults, pages, numWorkers):
+        features.extend(pageFeatures)
+        results.extend(pageResults)
 
-        getResult(degree, features, None, results, soup, doPrint, False)
+    return (features, header, results)
 
-        currentPage = currentPage + 1
+# Prints the number of results returned by 'scrapeResults' and, if 'doPrint' is set, the results
+def showResults(scraped, doPrint=True):
+    if scraped is None:
+        print "Total : 0 posts (GradCafe could not be reached)\n"
+        return
+
+    features, header, results = scraped
 
     print "Total : " + str(len(results)) + " posts\n"
 
@@ -60,9 +76,187 @@ def getResults(query, doPrint):
         pandas.set_option('display.width', 1000)
         print pandas.DataFrame(results, columns=header, index=range(len(results)))
 
-    return features
+# Generator of the feature vectors of every result, yielded page by page as each page is parsed
+# Later pages are fetched in the background while the results of earlier ones are consumed
+def iterResults(query, numWorkers=numWorkers):
+    firstPage = getParsedPage(query, 250, 1)
+
+    if firstPage is None:
+        return
+
+    features, header, results, numPages = firstPage
+
+    pages = iterPages(query, 250, range(2, numPages + 1), numWorkers)
+
+    try:
+        while features is not None:
+            for featureVector in features:
+                yield featureVector
+
+            features, results = next(pages, (None, None))
+    finally:
+        pages.close()
+
+# Generator of the feature vectors of results that are newer than every result whose ID is in 'knownIds'
+# Survey pages list the most recent results first, so reading stops at the first known result
+# Raises 'FanOut.IncompleteError' if a page cannot be fetched, since results past it would be skipped
+# by the next sync once the results read so far are stored
+def iterNewResults(query, knownIds):
+    numResults = 250
+    yieldedIds = set()
+
+    # The shorter first page read by option 4 in this session may already reach a known result
+    shortPage = SessionCache.get(getPageKey(query, 100, 1))
+
+    if shortPage is not None and SessionCache.get(getPageKey(query, numResults, 1)) is None:
+        for featureVector in shortPage[0]:
+            if featureVector.postId in knownIds:
+                return
+            yieldedIds.add(featureVector.postId)
+            yield featureVector
+
+    currentPage = 1
+    numPages = 1
+
+    while currentPage <= numPages:
+        page = getParsedPage(query, numResults, currentPage)
+
+        if page is None:
+            raise FanOut.IncompleteError('Could not fetch GradCafe page ' + str(currentPage))
+
+        pageFeatures, header, results, pageCount = page
+
+        # Find total number of pages
+        if currentPage == 1:
+            numPages = pageCount
+
+        for featureVector in pageFeatures:
+            if featureVector.postId in knownIds:
+                return
+            if featureVector.postId not in yieldedIds:
+                yield featureVector
+
+        currentPage = currentPage + 1
+
+# Returns the URL of a page of survey results
+def getPageUrl(queryStr, numResults, page):
+    return baseUrl + "/survey/index.php?q=" + queryStr + "&t=a&pp=" + str(numResults) + "&o=&p=" + str(page)
+
+# Returns the session cache key of a page of survey results for the query
+def getPageKey(query, numResults, page):
+    return ('GradCafe',) + QueryUtil.normalizeQuery(query) + (numResults, page)
+
+# Generator of (feature vectors, display rows) of the given pages, skipping pages that could not be fetched
+# Pages are fetched and parsed concurrently but handed back in page order
+def iterPages(query, numResults, pages, numWorkers=numWorkers):
+    if not pages:
+        return
+
+    pool = ThreadPool(min(numWorkers, len(pages)))
+
+    try:
+        for page in pool.imap(functools.partial(fetchPage, query, numResults), pages):
+            if page is None:
+                continue  # Keep partial results if a page times out
+
+            yield page
+    finally:
+        pool.terminate()
+
+# Returns (feature vectors, display rows) of a single page, or None if it could not be fetched
+def fetchPage(query, numResults, page):
+    parsed = getParsedPage(query, numResults, page)
+
+    if parsed is None:
+        return None
+
+    features, header, results, numPages = parsed
+
+    return (features, results)
+
+# Returns (feature vectors, header, display rows, total number of pages) of a page of results for the query,
+# or None if it could not be fetched. Pages read earlier in the session are taken from 'SessionCache'
+# Parsing runs in the parse pool, so pages fetched by different threads are parsed in parallel
+def getParsedPage(query, numResults, page):
+    key = getPageKey(query, numResults, page)
+    parsed = SessionCache.get(key)
+
+    if parsed is not None:
+        return parsed
+
+    queryStr = re.sub(r"\s+", '+', query[QueryUtil.schoolKey] + " " + query[QueryUtil.majorKey])
+
+    html_content = getPage(getPageUrl(queryStr, numResults, page))
+
+    if html_content is None:
+        return None
+
+    parsed = ParsePool.apply(extractPage, html_content, query[QueryUtil.degreeKey], True)
+    SessionCache.put(key, parsed)
+
+    return parsed
+
+# Returns HTML of a single page, or None if it could not be fetched
+def getPage(url):
+    try:
+        return HttpClient.get(url, headers={'User-Agent': 'Mozilla/5.0'}, source='GradCafe')
+    except requests.RequestException:
+        return None
+
+# Returns (feature vectors, header, display rows, total number of pages) of the HTML of a page
+# The header is only filled if 'fillHeader' is set. Runs in the parse pool (see 'ParsePool')
+def extractPage(html_content, degree, fillHeader):
+    if QueryUtil.fastParse:
+        return extractPageFast(html_content, degree, fillHeader)
+
+    soup = QueryUtil.parseHtml(html_content, 'GradCafe')
+
+    # Find total number of pages
+    div = soup.find("div", {"class": "pagination"})
+    numPages = len(div.find_all("a", href=True)) + 1 if div else 1
+
+    header   = list()
+    results  = list()
+    features = list()
+
+    getResult(degree, features, header, results, soup, False, fillHeader)
+
+    return (features, header, results, numPages)
+
+# Same as extractPage, but only reads the pagination div and the results table of an lxml tree
+def extractPageFast(html_content, degree, fillHeader):
+    tree = QueryUtil.parseTree(html_content, 'GradCafe')
+
+    header   = list()
+    results  = list()
+    features = list()
+
+    if tree is None:
+        return (features, header, results, 1)
+
+    with Profiler.stage('GradCafe', 'extract'):
+        # Find total number of pages
+        divs = tree.xpath('//div[contains(concat(" ", normalize-space(@class), " "), " pagination ")]')
+        numPages = len(divs[0].xpath('.//a[@href]')) + 1 if divs else 1
+
+        table = tree.find('.//table')
+
+        if table is not None:
+            rows = list()
+
+            for row in table.iter('tr'):
+                cols = list(row.iter('td'))
+                scoresInfo = cols[2].find('.//a') if len(cols) > 2 else None
+
+                rows.append(([col.text_content().strip() for col in cols],
+                             scoresInfo.text_content() if scoresInfo is not None else None))
+
+            getRowResults(degree, features, header, results, rows, fillHeader)
+
+    return (features, header, results, numPages)
 
 # Scrapes results for a single page
+@Profiler.timed('GradCafe', 'extract')
 def getResult(degree, featureVectors, header, results, soup, doPrint, fillHeader):
     table = soup.find('table')
 
@@ -71,10 +265,22 @@ def getResult(degree, featureVectors, header, results, soup, doPrint, fillHeader
             print "Total : 0 posts"
         return None
 
-    rows = table.find_all('tr')
+    rows = list()
+
+    for row in table.find_all('tr'):
+        cols = row.find_all('td')
+        scoresInfo = cols[2].find('a') if len(cols) > 2 else None
+
+        rows.append(([col.text.strip() for col in cols], scoresInfo.text if scoresInfo else None))
+
+    getRowResults(degree, featureVectors, header, results, rows, fillHeader)
+
+# Adds the results of the rows of a results table, given as (column texts, text of the scores link or None)
+def getRowResults(degree, featureVectors, header, results, rows, fillHeader):
     for i in range(len(rows)):
-        cols = rows[i].find_all('td')
-        colTexts = [col.text.strip() for col in cols]
+        colTexts, scoresInfo = rows[i]
+        colTexts = list(colTexts)
+        rowId = getRowId(colTexts)
 
         validResult = True
 
@@ -97,13 +303,11 @@ def getResult(degree, featureVectors, header, results, soup, doPrint, fillHeader
                         validResult = False
                         break
 
-                    scoresInfo = cols[j].find('a')
-
-                    if scoresInfo:
-                        match = re.match(r'.*GPA.*\s([0-9]\.[0-9]{2}).*', scoresInfo.text)
+                    if scoresInfo is not None:
+                        match = gpaPattern.match(scoresInfo)
                         gpaScore = match.group(1) if match else None
 
-                        match = re.match(r'.*GRE\s+General.+([0-9]{3}\/[0-9]{3}\/[0-9.]+).*', scoresInfo.text)
+                        match = greInfoPattern.match(scoresInfo)
                         greScore = match.group(1) if match else None
 
                         if gpaScore is None or greScore is None:
@@ -132,17 +336,17 @@ def getResult(degree, featureVectors, header, results, soup, doPrint, fillHeader
             # Data
 
             # 1. Add feature vector
-            gre = re.match(r'([0-9]+)/([0-9]+)/([0-9.]+)', greScore)
-
-            featureVector = dict()
-            featureVector[QueryUtil.decision]   = 1 if 'Accepted' == colTexts[1] else 0
-            featureVector[QueryUtil.gpaScore]   = float(gpaScore)
-            featureVector[QueryUtil.greVerbal]  = float(gre.group(1))
-            featureVector[QueryUtil.greQuant]   = float(gre.group(2))
-            featureVector[QueryUtil.greWriting] = float(gre.group(3))
-            featureVector[QueryUtil.workExp]    = hasWorkExperience(colTexts[4])
-            featureVector[QueryUtil.research]   = hasResearchExperience(colTexts[4])
-            featureVector[QueryUtil.status]     = 0 if 'A' == colTexts[2] else 1
+            gre = greScorePattern.match(greScore)
+
+            featureVector = AdmissionRecord(decision   = 1 if 'Accepted' == colTexts[1] else 0,
+                                            gpaScore   = float(gpaScore),
+                                            greVerbal  = float(gre.group(1)),
+                                            greQuant   = float(gre.group(2)),
+                                            greWriting = float(gre.group(3)),
+                                            workExp    = hasWorkExperience(colTexts[4]),
+                                            research   = hasResearchExperience(colTexts[4]),
+                                            status     = 0 if 'A' == colTexts[2] else 1,
+                                            postId     = rowId)
 
             featureVectors.append(featureVector)
 
@@ -151,6 +355,10 @@ def getResult(degree, featureVectors, header, results, soup, doPrint, fillHeader
             colTexts.insert(0, gpaScore)
             results.append(colTexts)
 
+# Returns an ID for a result row (GradCafe does not show one), derived from its contents
+def getRowId(colTexts):
+    return hashlib.sha1(u'|'.join(colTexts).encode('utf-8')).hexdigest()[:16]
+
 # Checks whether keywords related to work experience exist it the 'Notes' section
 def hasWorkExperience(notes):
     negativeKeywords = ['no work', 'no industry']
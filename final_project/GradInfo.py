@@ -1,14 +1,11 @@
 """
 The main script for gathering various graduate school information.
 """
-import FacultyInfo
-import StudentInfo
-import GoHackers
-import GradCafe
-import QueryUtil
-import UsNews
-
-from Predictor import Predictor
+import functools
+import Profiler
+import ParsePool
+import FanOut
+import Warmup
 
 # Ask user if he/she wants to initiate another query
 def continueQuery():
@@ -39,6 +36,8 @@ def getQuery(needSchool, needMajor, needDegree):
             degree = raw_input()
 
     # Create dictionary of query parameters
+    QueryUtil = Warmup.load('QueryUtil')
+
     query = dict()
     query[QueryUtil.schoolKey] = school
     query[QueryUtil.degreeKey] = degree
@@ -46,6 +45,13 @@ def getQuery(needSchool, needMajor, needDegree):
 
     return query
 
+# Start the parse processes before any fetching thread is running
+ParsePool.start()
+
+# Import the modules of the menu options in the background, loading rankings as soon
+# as possible so option 1 answers from memory
+Warmup.start(Warmup.optionModules, { 'UsNews' : lambda UsNews: UsNews.prefetch() })
+
 # Main loop
 while True:
     print "    ============================================================"
@@ -59,12 +65,16 @@ while True:
     print "      4 = View admission history for specified school"
     print "      5 = Predict chance of admission for specified school"
     print "      6 = Quit"
+    print "      7 = Switch stage timing (off -> timing -> timing with cProfile)"
     print ""
     print "    ============================================================"
 
     input = raw_input()
     input = int(input) if input.isdigit() else 6
 
+    # Time each query separately
+    Profiler.reset()
+
     if input == 1:
         # Create options
         options = dict()
@@ -86,8 +96,11 @@ while True:
 
         if input in options:
             # Print query results if valid input
+            UsNews = Warmup.load('UsNews')
             UsNews.getTop20(options[input])
 
+            Profiler.printReport()
+
             if not continueQuery():
                 break
         else:
@@ -97,8 +110,11 @@ while True:
         query = getQuery(True, True, False)
 
         # Print list of faculty members
+        FacultyInfo = Warmup.load('FacultyInfo')
         FacultyInfo.getResults(query)
 
+        Profiler.printReport()
+
         if not continueQuery():
             break
     elif input == 3:
@@ -106,8 +122,11 @@ while True:
         query = getQuery(True, True, False)
 
         # Print list of students
+        StudentInfo = Warmup.load('StudentInfo')
         StudentInfo.getResults(query)
 
+        Profiler.printReport()
+
         if not continueQuery():
             break
     elif input == 4:
@@ -116,14 +135,25 @@ while True:
 
         print "\n\n"
 
-        # Print results from different sites
-        print "GradCafe Results:\n"
-        GradCafe.getResults(query, True)
+        # Scrape both sites at the same time and print results of each site as soon as it is done
+        GradCafe = Warmup.load('GradCafe')
+        GoHackers = Warmup.load('GoHackers')
 
-        print "\n\n"
+        sites = { 'GradCafe' : GradCafe, 'GoHackers' : GoHackers }
+        sources = [('GradCafe', functools.partial(GradCafe.scrapeResults, query, True)),
+                   ('GoHackers', functools.partial(GoHackers.scrapeResults, query, True))]
+
+        for source in FanOut.run(sources):
+            print source.name + " Results:\n"
+
+            if source.finished:
+                sites[source.name].showResults(source.results)
+            elif source.error is None:
+                print "Stopped waiting after " + str(FanOut.maxTime) + " seconds"
 
-        print "GoHackers Results:\n"
-        GoHackers.getResults(query, True)
+            print "\n\n"
+
+        Profiler.printReport()
 
         if not continueQuery():
             break
@@ -135,25 +165,38 @@ while True:
 
         print "\n"
 
-        # Get results from GradCafe
-        gradResults = GradCafe.getResults(query, False)
+        # Fetch posts that are not in the local store yet from both sites at the same time
+        AdmissionStore = Warmup.load('AdmissionStore')
+        Predictor = Warmup.load('Predictor').Predictor
 
-        QueryUtil.refineQuery(query)
+        unsynced = AdmissionStore.sync(query)
 
-        # Get results from GoHackers
-        goResults = GoHackers.getResults(query, False)
+        # Stream results from GradCafe and GoHackers into the predictor
+        gradResults, goResults = AdmissionStore.iterResults(query, unsynced)
 
         # Predict outcome
         doExperiment = False
 
-        predictor = Predictor(gradResults, goResults)
+        predictor = Predictor(gradResults, goResults, query)
 
         if doExperiment:
             predictor.runExperiment()
         else:
             predictor.predict()
 
+        Profiler.printReport()
+
         if not continueQuery():
             break
+    elif input == 7:
+        if not Profiler.enabled:
+            Profiler.enable()
+            print "    Stage timing is on\n"
+        elif not Profiler.profileParsing:
+            Profiler.enable(True)
+            print "    Stage timing with cProfile of parsing is on\n"
+        else:
+            Profiler.disable()
+            print "    Stage timing is off\n"
     else:
         break
@@ -0,0 +1,184 @@
+"""
+Shared fetch layer for every scraper, backed by an on-disk cache of HTTP responses
+and a pooled session with per-host rate limiting and timeouts
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+import requests
+import DiskCache
+import Profiler
+
+from requests.adapters import HTTPAdapter
+from urlparse import urlparse
+
+# Connection settings
+
+poolSize       = 16    # Keep-alive connections kept open for each host
+connectTimeout = 5.0   # Seconds to wait for a connection to be established
+readTimeout    = 20.0  # Seconds to wait for the server to send data
+maxRateWait    = 30.0  # Seconds a request may wait for the rate limiter before giving up
+
+# Requests per second and burst size allowed for each host
+rateLimits = {
+    'www.gohackers.com' : (5.0, 10),
+    'thegradcafe.com'   : (5.0, 10),
+    'www.google.com'    : (0.5, 2),
+    'www.indeed.com'    : (2.0, 5),
+}
+
+defaultRateLimit = (10.0, 20)
+
+# Cache settings
+
+cacheDir     = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cache', 'http')
+cacheEnabled = True
+maxCacheSize = 200 * 1024 * 1024  # Bytes kept on disk before least recently used entries are evicted
+
+# Time-to-live (in seconds) of cached responses for each source
+hour = 60 * 60
+day  = 24 * hour
+
+ttls = {
+    'GradCafe'    : 6 * hour,
+    'GoHackers'   : 6 * hour,
+    'FacultyInfo' : 7 * day,
+    'StudentInfo' : 1 * day,
+    'UsNews'      : 30 * day,
+    'Google'      : 7 * day,
+}
+
+defaultTtl = 1 * day
+
+# Returns the body of the given URL as text, served from the cache when possible
+def get(url, headers=None, source=None):
+    start = time.time()
+
+    body, cached = load(url, dict(headers) if headers else dict(), source)
+
+    Profiler.record(source, 'cache' if cached else 'network', time.time() - start, len(body))
+
+    return body
+
+# Returns a tuple of the body of the given URL and whether it came from the cache without a request
+def load(url, headers, source):
+    if not cacheEnabled:
+        return (fetch(url, headers).text, False)
+
+    key = cacheKey(url, headers)
+    entry = cache.load(key)
+
+    if entry and time.time() - entry['fetched'] < ttls.get(source, defaultTtl):
+        return (entry['body'], True)
+
+    # Revalidate expired entry if the server gave us a validator
+    if entry:
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('lastModified'):
+            headers['If-Modified-Since'] = entry['lastModified']
+
+    response = fetch(url, headers)
+
+    if entry and response.status_code == 304:
+        entry['fetched'] = time.time()
+        cache.store(key, entry)
+        return (entry['body'], False)
+
+    if response.status_code == 200:
+        entry = dict()
+        entry['url']          = url
+        entry['fetched']      = time.time()
+        entry['etag']         = response.headers.get('ETag')
+        entry['lastModified'] = response.headers.get('Last-Modified')
+        entry['body']         = response.text
+        cache.store(key, entry)
+
+    return (response.text, False)
+
+# Sends a GET request through the shared session once the host's rate limiter allows it
+# Raises a 'requests.RequestException' on timeouts, connection errors, server errors and rate limiting
+def fetch(url, headers):
+    host = urlparse(url).netloc
+
+    if not rateLimiter(host).acquire(maxRateWait):
+        raise RateLimitError('Rate limit of ' + host + ' exceeded')
+
+    response = session.get(url, headers=headers, timeout=(connectTimeout, readTimeout))
+
+    # Server errors are failures like timeouts, other responses are handed back as they are
+    if response.status_code >= 500:
+        response.raise_for_status()
+
+    return response
+
+# Returns the rate limiter for the given host
+def rateLimiter(host):
+    with rateLimitersLock:
+        if host not in rateLimiters:
+            rate, burst = rateLimits.get(host, defaultRateLimit)
+            rateLimiters[host] = TokenBucket(rate, burst)
+        return rateLimiters[host]
+
+# Returns a session that keeps a pool of connections alive for each host
+def createSession():
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=poolSize, pool_maxsize=poolSize)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+# Returns the cache key for the given URL and request headers
+def cacheKey(url, headers):
+    key = url + '\n' + '\n'.join(k.lower() + ':' + v for k, v in sorted(headers.items()))
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+# Removes every cached response
+def clearCache():
+    cache.clear()
+
+# Raised when a request would have to wait too long for the rate limiter
+class RateLimitError(requests.RequestException):
+    pass
+
+# Token bucket allowing 'rate' requests per second with bursts of up to 'burst' requests
+class TokenBucket:
+
+    # Constructor
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.time()
+        self.lock = threading.Lock()
+
+    # Takes a token, waiting at most 'timeout' seconds for one; returns whether a token was taken
+    def acquire(self, timeout):
+        deadline = time.time() + timeout
+
+        while True:
+            with self.lock:
+                now = time.time()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return True
+
+                wait = (1 - self.tokens) / self.rate
+
+            if now + wait > deadline:
+                return False
+
+            time.sleep(wait)
+
+cache = DiskCache.DiskCache(cacheDir, maxCacheSize, json, '.json')
+
+session = createSession()
+
+rateLimiters = dict()
+rateLimitersLock = threading.Lock()
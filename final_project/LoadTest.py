@@ -0,0 +1,86 @@
+"""
+Load test of the GradCafe and GoHackers scrapers against the local stand-in server.
+
+Runs many admission history queries at the same time with the HTTP cache turned
+off and reports query latencies, throughput and how many requests failed:
+
+    python LoadTest.py --queries 20 --concurrency 5 --latency 0.1 --error-rate 0.05
+"""
+
+import argparse
+import time
+import GoHackers
+import GradCafe
+import HttpClient
+import ParsePool
+import QueryUtil
+import SessionCache
+import StandInServer
+
+from multiprocessing.pool import ThreadPool
+
+# Runs one query against both scrapers and returns (seconds taken, number of results)
+def runQuery(query):
+    start = time.time()
+
+    numResults = len(GradCafe.getResults(query, False)) + len(GoHackers.getResults(query, False))
+
+    return (time.time() - start, numResults)
+
+def main():
+    parser = argparse.ArgumentParser(description='Load test of the scrapers against the stand-in server')
+    parser.add_argument('--queries', type=int, default=20, help='number of queries to run')
+    parser.add_argument('--concurrency', type=int, default=5, help='number of queries running at the same time')
+    parser.add_argument('--latency', type=float, default=0.05, help='mean seconds before each response')
+    parser.add_argument('--jitter', type=float, default=0.02, help='standard deviation of the latency')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fraction of requests that fail with status 500')
+    parser.add_argument('--gradcafe-pages', type=int, default=5)
+    parser.add_argument('--gohackers-posts', type=int, default=200)
+    args = parser.parse_args()
+
+    settings = StandInServer.Settings(args.latency, args.jitter, args.error_rate, args.gradcafe_pages, args.gohackers_posts)
+    # Parse in worker processes as GradInfo does, forking before the server and query threads start
+    ParsePool.start()
+
+    server = StandInServer.start(settings=settings)
+
+    StandInServer.pointScrapers(server.getUrl())
+
+    # Measure the scrapers, not the caches or the rate limiter
+    HttpClient.cacheEnabled = False
+    SessionCache.enabled = False
+    HttpClient.rateLimits[server.getUrl().split('//')[1]] = (1000000.0, 1000000)
+
+    queries = list()
+    for i in range(args.queries):
+        query = dict()
+        query[QueryUtil.schoolKey] = StandInServer.schools[i % len(StandInServer.schools)]
+        query[QueryUtil.majorKey]  = 'Computer Science'
+        query[QueryUtil.degreeKey] = 'PhD'
+        queries.append(query)
+
+    start = time.time()
+
+    pool = ThreadPool(args.concurrency)
+    try:
+        results = pool.map(runQuery, queries)
+    finally:
+        pool.terminate()
+
+    elapsed = time.time() - start
+
+    latencies = sorted(result[0] for result in results)
+
+    print "\n\nQueries          : {} ({} at a time)".format(len(queries), args.concurrency)
+    print "Total time       : {:.2f}s ({:.2f} queries/s)".format(elapsed, len(queries) / elapsed)
+    print "Query latency    : min {:.2f}s, median {:.2f}s, max {:.2f}s".format(latencies[0], latencies[len(latencies) / 2], latencies[-1])
+    print "Results          : {}".format(sum(result[1] for result in results))
+    print "Requests         : {} ({:.1f}/s)".format(server.numRequests, server.numRequests / elapsed)
+    print "Failed requests  : {}".format(server.numErrors)
+
+    server.shutdown()
+
+    ParsePool.close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+"""
+On-disk cache of fitted Predictor models, keyed by query and training data
+
+The most recently used models are also kept in memory, so a long-running process
+(see 'Service.py') does not unpickle them for every prediction.
+"""
+
+import collections
+import hashlib
+import os
+import threading
+import cPickle
+import DiskCache
+import QueryUtil
+
+# Cache settings
+
+cacheDir     = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cache', 'models')
+maxCacheSize = 100 * 1024 * 1024  # Bytes kept on disk before least recently used models are evicted
+maxInMemory  = 32                 # Models kept in memory before least recently used ones are forgotten
+
+# Models kept in memory by key, least recently used first
+inMemory = collections.OrderedDict()
+
+inMemoryLock = threading.Lock()
+
+# Held while the stored models of a query are replaced or removed, so that queries running at the same
+# time (see 'Batch.py' and 'Service.py') keep a single entry per query
+storeLock = threading.Lock()
+
+# Returns the cache key for the query and its feature matrix, "<query hash>-<data hash>"
+def getKey(query, data):
+    return getQueryKey(query) + '-' + hashlib.sha1(data.tostring()).hexdigest()
+
+# Returns the part of the cache key that depends on the query only
+def getQueryKey(query):
+    return hashlib.sha1('|'.join(QueryUtil.normalizeQuery(query)).encode('utf-8')).hexdigest()
+
+# Returns the models stored for the key, or None if there are none
+def load(key):
+    with inMemoryLock:
+        models = inMemory.pop(key, None)
+        if models is not None:
+            inMemory[key] = models
+            return models
+
+    models = cache.load(key)
+
+    if models is not None:
+        keepInMemory(key, models)
+
+    return models
+
+# Stores the models for the key, replacing models of the same query trained on other data
+def store(key, models):
+    with storeLock:
+        cache.clear(key.split('-')[0])
+        cache.store(key, models)
+
+        keepInMemory(key, models)
+
+# Removes stored models of the query, or every stored model if no query is given
+def invalidate(query=None):
+    prefix = getQueryKey(query) if query else ''
+
+    with storeLock:
+        forget(prefix)
+        cache.clear(prefix)
+
+# Keeps the models for the key in memory, forgetting models of the same query trained on other data
+def keepInMemory(key, models):
+    prefix = key.split('-')[0]
+
+    with inMemoryLock:
+        for otherKey in [otherKey for otherKey in inMemory if otherKey.startswith(prefix)]:
+            del inMemory[otherKey]
+
+        inMemory[key] = models
+
+        while len(inMemory) > maxInMemory:
+            inMemory.popitem(last=False)
+
+# Forgets the models in memory whose key starts with the given prefix
+def forget(prefix):
+    with inMemoryLock:
+        for key in [key for key in inMemory if key.startswith(prefix)]:
+            del inMemory[key]
+
+# Serializes models with the highest pickle protocol
+class Serializer:
+
+    @staticmethod
+    def dumps(models):
+        return cPickle.dumps(models, cPickle.HIGHEST_PROTOCOL)
+
+    @staticmethod
+    def loads(content):
+        return cPickle.loads(content)
+
+cache = DiskCache.DiskCache(cacheDir, maxCacheSize, Serializer, '.pkl')
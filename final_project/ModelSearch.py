@@ -0,0 +1,147 @@
+"""
+Cross-validated search over model parameters, run across a pool of processes
+"""
+
+import multiprocessing
+import random
+import time
+import numpy as np
+import pandas
+
+from sklearn import svm
+from sklearn import neighbors
+from sklearn import decomposition
+from sklearn.model_selection import KFold
+
+# Model names
+knn = 'kNN'
+svmRbf = 'SVM'
+
+# Names of the parameter of each model
+parameterNames = { knn : 'Num. Neighbors', svmRbf : 'Gamma' }
+
+# Projected folds shared with worker processes, keyed by (fold, number of PCA dimensions)
+projections = None
+
+# Returns an unfitted model with the given parameter
+def createModel(modelName, parameter):
+    if modelName == knn:
+        return neighbors.KNeighborsClassifier(parameter, weights='distance')
+    else:
+        return svm.SVC(decision_function_shape='ovo', kernel='rbf', gamma=parameter, C=1000)
+
+# Returns every (model, number of dimensions, parameter) combination to try
+def getCandidates(dimension, numTraining):
+    candidates = list()
+
+    for numDimensions in range(1, dimension, 2):
+        for numNeighbors in range(1, max(int(numTraining / 3), 2), 2):
+            candidates.append((knn, numDimensions, numNeighbors))
+        for gamma in range(100, 1000, 100):
+            candidates.append((svmRbf, numDimensions, gamma))
+
+    return candidates
+
+# Projects each fold onto each number of PCA dimensions, fitting PCA once per fold and dimension
+def project(data, labels, folds, dimensions):
+    projected = dict()
+
+    for fold, (trainIndex, testIndex) in enumerate(folds):
+        for numDimensions in dimensions:
+            pca = decomposition.PCA(n_components=numDimensions)
+            pca.fit(data[trainIndex])
+
+            projected[(fold, numDimensions)] = (pca.transform(data[trainIndex]), labels[trainIndex],
+                                                pca.transform(data[testIndex]), labels[testIndex])
+
+    return projected
+
+# Initializes a worker process with the projected folds
+def initWorker(projected):
+    global projections
+    projections = projected
+
+# Returns (candidate, accuracy, fit time, predict time) averaged over every fold
+def evaluate(candidate):
+    modelName, numDimensions, parameter = candidate
+
+    numFolds = len([key for key in projections if key[1] == numDimensions])
+
+    accuracy = 0.0
+    fitTime = 0.0
+    predictTime = 0.0
+
+    for fold in range(numFolds):
+        trainData, trainLabels, testData, testLabels = projections[(fold, numDimensions)]
+
+        model = createModel(modelName, parameter)
+
+        start = time.time()
+        model.fit(trainData, trainLabels)
+        fitTime += time.time() - start
+
+        start = time.time()
+        predictedLabels = model.predict(testData)
+        predictTime += time.time() - start
+
+        accuracy += np.mean(predictedLabels == testLabels)
+
+    return (candidate, accuracy / numFolds, fitTime / numFolds, predictTime / numFolds)
+
+# Searches over parameters of the models using k-fold cross-validation and prints the results
+#   numFolds      : number of folds for cross-validation
+#   numProcesses  : size of the process pool (number of CPUs by default)
+#   maxTime       : seconds after which the search stops and reports finished candidates only
+#   numCandidates : if given, only this many randomly chosen candidates are tried
+def search(data, labels, numFolds=5, numProcesses=None, maxTime=300, numCandidates=None):
+    numFolds = min(numFolds, data.shape[0])
+
+    if numFolds < 2:
+        print "Not enough data for cross-validation"
+        return list()
+
+    folds = list(KFold(n_splits=numFolds, shuffle=True).split(data))
+
+    numTraining = min(len(trainIndex) for trainIndex, testIndex in folds)
+    candidates = getCandidates(min(data.shape[1], numTraining), numTraining)
+
+    if numCandidates is not None and numCandidates < len(candidates):
+        candidates = random.sample(candidates, numCandidates)
+
+    projected = project(data, labels, folds, sorted(set(candidate[1] for candidate in candidates)))
+
+    deadline = time.time() + maxTime
+    results = list()
+
+    pool = multiprocessing.Pool(numProcesses, initWorker, (projected,))
+
+    try:
+        iterator = pool.imap_unordered(evaluate, candidates)
+
+        for i in range(len(candidates)):
+            results.append(iterator.next(max(deadline - time.time(), 0)))
+    except multiprocessing.TimeoutError:
+        print "\nSearch stopped after {} seconds ({}/{} candidates done)".format(maxTime, len(results), len(candidates))
+    finally:
+        pool.terminate()
+        pool.join()
+
+    printResults(results)
+
+    return results
+
+# Prints the results of each model sorted by accuracy
+def printResults(results):
+    pandas.set_option('display.width', 1000)
+
+    for modelName in [knn, svmRbf]:
+        rows = list()
+
+        for candidate, accuracy, fitTime, predictTime in sorted(results, key=lambda result: -result[1]):
+            if candidate[0] == modelName:
+                rows.append([candidate[1], candidate[2], '{:.2f}'.format(accuracy), '{:.4f}'.format(fitTime), '{:.4f}'.format(predictTime)])
+
+        header = ['Num. Dimensions', parameterNames[modelName], 'Accuracy', 'Fit Time (s)', 'Predict Time (s)']
+
+        print "\nClassification using " + ("k-Nearest Neighbors" if modelName == knn else "SVM with RBF kernel")
+        print pandas.DataFrame(rows, columns=header, index=range(len(rows)))
@@ -0,0 +1,121 @@
+"""
+Structured results of the GradInfo menu options, for running queries without the menu.
+
+Each option returns a list of records (dictionaries of plain values) instead of printing
+them, so results can be written as JSON or CSV (see 'Batch.py'). Option 1 takes the area
+(e.g. "Engineering") in place of the major of the query.
+"""
+
+import functools
+import AdmissionStore
+import FacultyInfo
+import FanOut
+import GoHackers
+import GradCafe
+import QueryUtil
+import StudentInfo
+import UsNews
+
+from Predictor import Predictor
+
+# Raised for a query the option cannot run (e.g. an unknown area), as opposed to a failure while running it
+class OptionError(ValueError):
+    pass
+
+# Short names of the options, by menu number
+names = { 1 : 'rankings', 2 : 'faculty', 3 : 'students', 4 : 'admissions', 5 : 'prediction' }
+
+# Fields of the records of each option, in the order they are written
+columns = {
+    1 : ['field', 'rank', 'name', 'location', 'tuition'],
+    2 : ['name', 'url', 'description'],
+    3 : ['name', 'job_title', 'location', 'education', 'webpage', 'work_experience'],
+    4 : ['source', QueryUtil.postId, QueryUtil.decision, QueryUtil.gpaScore, 'gpaScale', QueryUtil.greVerbal,
+         QueryUtil.greQuant, QueryUtil.greWriting, QueryUtil.workExp, QueryUtil.research, QueryUtil.status],
+    5 : ['model', 'accuracy', 'numCorrect', 'numTests', 'numTraining'],
+}
+
+# Returns the records of a menu option for the query
+def run(option, query):
+    if option not in functions:
+        raise OptionError('Unknown option: ' + str(option))
+
+    return functions[option](query)
+
+# Option 1: the ranked schools of the area, best first
+def getRankings(query):
+    area = query[QueryUtil.majorKey]
+
+    if UsNews.getUrl(area) is None:
+        raise OptionError('Unknown area: ' + area)
+
+    rankings = UsNews.getRankings(area)
+
+    if rankings is None:
+        raise IOError('Could not reach US News')
+
+    return [getFields(ranking) for ranking in rankings]
+
+# Option 2: the faculty members of the major at the school
+def getFaculty(query):
+    records = list()
+
+    for url, name, description in FacultyInfo.iterResults(query):
+        records.append({ 'name' : name, 'url' : url, 'description' : description })
+
+    return records
+
+# Option 3: the resumes of current students of the school
+def getStudents(query):
+    return list(StudentInfo.iterResults(query))
+
+# Option 4: the latest admission results posted on GradCafe and GoHackers, as option 4 shows them
+# Both sites are scraped at the same time, as GradInfo does, with the same deadline
+def getAdmissions(query):
+    sources = [('GradCafe', functools.partial(GradCafe.scrapeResults, query, True)),
+               ('GoHackers', functools.partial(GoHackers.scrapeResults, query, True))]
+
+    scraped = dict()
+
+    for source in FanOut.run(sources):
+        if source.error is not None:
+            raise source.error
+        if not source.finished:
+            raise IOError('Stopped waiting for ' + source.name + ' after ' + str(FanOut.maxTime) + ' seconds')
+
+        scraped[source.name] = source.results
+
+    # GradCafe gives None if it could not be reached
+    results = { 'GradCafe' : scraped['GradCafe'][0] if scraped['GradCafe'] else [], 'GoHackers' : scraped['GoHackers'][0] }
+
+    records = list()
+
+    for source in ['GradCafe', 'GoHackers']:
+        for result in results[source]:
+            record = getFields(result)
+            record['source'] = source
+            records.append(record)
+
+    return records
+
+# Option 5: the accuracy of each model predicting the admission results of the query held out for testing
+def getPrediction(query):
+    unsynced = AdmissionStore.sync(query, doPrint=False)
+    gradResults, goResults = AdmissionStore.iterResults(query, unsynced)
+
+    evaluation = Predictor(gradResults, goResults, query).evaluate()
+
+    records = list()
+
+    for model in ['knn', 'svm']:
+        accuracy, numCorrect = evaluation[model]
+        records.append({ 'model' : model, 'accuracy' : accuracy, 'numCorrect' : numCorrect,
+                         'numTests' : evaluation['numTests'], 'numTraining' : evaluation['numTraining'] })
+
+    return records
+
+# Returns a dictionary of the fields of a record with '__slots__' (e.g. 'AdmissionRecord')
+def getFields(record):
+    return dict((key, getattr(record, key)) for key in record.__slots__)
+
+functions = { 1 : getRankings, 2 : getFaculty, 3 : getStudents, 4 : getAdmissions, 5 : getPrediction }
@@ -0,0 +1,83 @@
+"""
+Process pool for parsing HTML off the GIL.
+
+Fetching stays on threads, which hand raw HTML to a parse function running in a
+worker process and get back only the small extracted records. Stage timings and
+cProfile snapshots recorded in the workers are merged into 'Profiler'. Set the
+environment variable GRADINFO_PARSE_PROCESSES (or 'numProcesses') to 0 to parse
+in the calling thread.
+"""
+
+import importlib
+import multiprocessing
+import os
+import threading
+import Profiler
+
+# Settings
+
+numProcesses = int(os.environ.get('GRADINFO_PARSE_PROCESSES', multiprocessing.cpu_count() if multiprocessing.cpu_count() > 1 else 0))
+
+# Modules of the parse functions, imported by each worker as soon as it starts
+# (GradInfo starts the pool before importing them, so workers would import them on their first task)
+workerModules = ['GradCafe', 'GoHackers', 'FacultyInfo']
+
+pool = None
+lock = threading.Lock()
+
+# Returns the result of 'function(*args)', run in a worker process if the pool is enabled
+# The function must be defined at module level and its arguments and result must be picklable
+def apply(function, *args):
+    if numProcesses <= 0:
+        return function(*args)
+
+    result, stats, profileStats = getPool().apply(runTask, (function, args, Profiler.isRecording(), Profiler.profileParsing))
+
+    Profiler.merge(stats, profileStats)
+
+    return result
+
+# Returns the pool, starting its processes on first use
+def getPool():
+    global pool
+
+    with lock:
+        if pool is None:
+            pool = multiprocessing.Pool(numProcesses, initWorker)
+        return pool
+
+# Starts the worker processes ahead of time (forking before other threads start is safest)
+def start():
+    if numProcesses > 0:
+        getPool()
+
+# Stops the worker processes
+def close():
+    global pool
+
+    with lock:
+        if pool is not None:
+            pool.terminate()
+            pool.join()
+            pool = None
+
+# Initializes a worker process
+def initWorker():
+    # The lock may have been held by another thread of the parent when the process was forked
+    Profiler.lock = threading.Lock()
+
+    for name in workerModules:
+        importlib.import_module(name)
+
+# Runs a task in a worker process and returns (result, stage timings, cProfile snapshot stats recorded while running it)
+def runTask(function, args, timing, withProfiles):
+    if timing:
+        Profiler.enable(withProfiles)
+    else:
+        Profiler.disable()
+
+    Profiler.reset()
+
+    result = function(*args)
+
+    return (result, Profiler.getStats(), Profiler.getProfileStats())
@@ -4,21 +4,34 @@ Uses machine learning model to predict chances of admission
 
 import numpy as np
 import pandas
-import QueryUtil
+import FeatureBuilder
+import ModelCache
+import ModelSearch
+import Profiler
 
-from sklearn import svm
-from sklearn import neighbors
 from sklearn import decomposition
 
 class Predictor:
 
     # Constructor
-    def __init__(self, gradResults, goResults):
+    # 'gradResults' and 'goResults' are lists or generators of results, consumed as feature rows are built
+    # If 'query' is given, models fitted on the same data for the same query are loaded instead of refitted
+    def __init__(self, gradResults, goResults, query=None):
         # Dimension of dictionary
-        self.dimension = 8
+        self.dimension = len(FeatureBuilder.columns)
+
+        # Build feature vectors from the results
+        with Profiler.stage('Predictor', 'preProcess'):
+            data = FeatureBuilder.buildMatrix(gradResults, goResults)
+
+        # Reuse the fitted models if possible
+        self.modelKey = ModelCache.getKey(query, data) if query else None
+
+        if self.modelKey and self.loadModels():
+            return
 
         # Pre-process the data to create full training/testing data
-        data = self.preProcess(gradResults, goResults)
+        data = self.preProcess(data)
 
         # Partition the data into training and testing
         numTraining = int(0.8 * data.shape[0])
@@ -34,90 +47,57 @@ class Predictor:
         self.fitKnn(5)
         self.fitSvm(10)
 
+        if self.modelKey:
+            self.saveModels()
+
     # Returns structured data to be used in machine learning library
-    def preProcess(self, gradResults, goResults):
-        data = np.ndarray(shape=(self.dimension, 0), dtype=np.float)
-
-        for results in [gradResults, goResults]:
-            for result in results:
-                vector = np.ndarray(shape=(self.dimension, 1), dtype=np.float)
-
-                gpa = result[QueryUtil.gpaScore]
-                achievedGpa = None
-                maxPossibleGpa = None
-
-                if gpa:
-                    if isinstance(gpa, float):
-                        if float(gpa) > 0:
-                            achievedGpa = float(gpa)
-                            maxPossibleGpa = 4.0
-                    else:
-                        if '/' in gpa:
-                            tokens = gpa.split('/')
-                            achievedGpa = tokens[0]
-                            maxPossibleGpa = tokens[1]
-
-                if achievedGpa and maxPossibleGpa:
-                    gpa = QueryUtil.normalizeGpa(achievedGpa, maxPossibleGpa)
-                    if gpa > 1:
-                        continue
-                    else:
-                        vector[0,0] = gpa
-                else:
-                    continue
+    def preProcess(self, data):
+        np.random.shuffle(data)
 
-                verbal = result[QueryUtil.greVerbal]
+        return data
 
-                if isinstance(verbal, float) or (verbal and verbal.isdigit() and int(verbal) > 0):
-                    vector[1,0] = QueryUtil.normalizeGre(verbal)
-                else:
-                    continue
+    # Names of attributes that make up the fitted pipeline
+    modelAttributes = ['trainingData', 'testingData', 'trainingLabels', 'testingLabels', 'pca', 'knn', 'svm']
 
-                quant = result[QueryUtil.greQuant]
+    # Loads the fitted pipeline from the model cache, returns whether it was found
+    def loadModels(self):
+        models = ModelCache.load(self.modelKey)
 
-                if isinstance(quant, float) or (quant and quant.isdigit() and int(quant) > 0):
-                    vector[2,0] = QueryUtil.normalizeGre(quant)
-                else:
-                    continue
+        if models is None:
+            return False
 
-                writing = result[QueryUtil.greWriting]
+        for attribute in self.modelAttributes:
+            setattr(self, attribute, models[attribute])
 
-                try:
-                    if isinstance(writing, float) or (writing and float(writing) > 0):
-                        vector[3,0] = float(writing)
-                    else:
-                        continue
-                except Exception:
-                    continue
+        return True
 
-                vector[4,0] = float(result[QueryUtil.workExp])
-                vector[5,0] = float(result[QueryUtil.research])
-                vector[6,0] = float(result[QueryUtil.status])
-                vector[7,0] = float(result[QueryUtil.decision])
+    # Saves the fitted pipeline to the model cache
+    def saveModels(self):
+        models = dict()
 
-                data = np.hstack((data, vector))
+        for attribute in self.modelAttributes:
+            models[attribute] = getattr(self, attribute)
 
-        data = data.transpose()
-
-        np.random.shuffle(data)
-
-        return data
+        ModelCache.store(self.modelKey, models)
 
     # Perform PCA on training data for dimensionality reduction
+    @Profiler.timed('Predictor', 'pca')
     def performPCA(self, numComponents):
         self.pca = decomposition.PCA(n_components=numComponents)
         self.pca.fit(self.trainingData)
 
     # Fit k-NN model based on acquired training data
+    @Profiler.timed('Predictor', 'knn')
     def fitKnn(self, numNeighbors):
         numTraining = self.trainingData.shape[0]
-        self.knn = neighbors.KNeighborsClassifier(numNeighbors, weights='distance')
+        self.knn = ModelSearch.createModel(ModelSearch.knn, numNeighbors)
         self.knn.fit(self.pca.transform(self.trainingData), self.trainingLabels.reshape((numTraining,)))
 
     # Fit SVM model based on acquired training data
+    @Profiler.timed('Predictor', 'svm')
     def fitSvm(self, gamma):
         numTraining = self.trainingData.shape[0]
-        self.svm = svm.SVC(decision_function_shape='ovo',kernel='rbf',gamma=gamma,C=1000)
+        self.svm = ModelSearch.createModel(ModelSearch.svmRbf, gamma)
         self.svm.fit(self.pca.transform(self.trainingData), self.trainingLabels.reshape((numTraining,)))
 
     # Perform prediction on held-out test data
@@ -138,6 +118,18 @@ class Predictor:
 
         print '\n\n'
 
+    # Returns a dictionary of the numbers of training and testing data and the
+    # (accuracy, number of correct predictions) of each model on held-out test data
+    def evaluate(self):
+        evaluation = dict()
+        evaluation['numTraining'] = self.trainingData.shape[0]
+        evaluation['numTests']    = self.testingLabels.shape[0]
+
+        for name, model in [('knn', self.knn), ('svm', self.svm)]:
+            evaluation[name] = self.getResults(model.predict(self.pca.transform(self.testingData)), list())
+
+        return evaluation
+
     # Prints the result of predictions
     def printResults(self, model):
         numTests = self.testingLabels.shape[0]
@@ -179,52 +171,9 @@ class Predictor:
 
         return (float(numCorrect) / float(numTests), numCorrect)
 
-    # Runs experiment to fit the model using various combination of parameters
-    def runExperiment(self):
-        numTraining = self.trainingData.shape[0]
-
-        print "\nClassification using k-Nearest Neighbors"
-
-        results = list()
-
-        for i in range(1, self.dimension - 1, 2):
-            self.performPCA(i)
-            for j in range(1, int(numTraining / 3), 2):
-                self.fitKnn(j)
-                predictedLabels = self.knn.predict(self.pca.transform(self.testingData))
-                res = self.getResults(predictedLabels, list())
-
-                result = list()
-                result.append(i)
-                result.append(j)
-                result.append('{:.2f}'.format(res[0]))
-
-                results.append(result)
+    # Runs cross-validated search over combinations of parameters to fit the model (see 'ModelSearch.search')
+    def runExperiment(self, numFolds=5, numProcesses=None, maxTime=300, numCandidates=None):
+        data = np.vstack((self.trainingData, self.testingData))
+        labels = np.vstack((self.trainingLabels, self.testingLabels)).reshape((data.shape[0],))
 
-        header = ['Num. Dimensions', 'Num. Neighbors', 'Accuracy']
-
-        pandas.set_option('display.width', 1000)
-        print pandas.DataFrame(results, columns=header, index=range(len(results)))
-
-        print "\nClassification using SVM with RBF kernel"
-
-        results = list()
-
-        for i in range(1, self.dimension - 1, 2):
-            self.performPCA(i)
-            for j in range(100, 1000, 100):
-                self.fitSvm(j)
-                predictedLabels = self.svm.predict(self.pca.transform(self.testingData))
-                res = self.getResults(predictedLabels, list())
-
-                result = list()
-                result.append(i)
-                result.append(j)
-                result.append('{:.2f}'.format(res[0]))
-
-                results.append(result)
-
-        header = ['Num. Dimensions', 'Gamma', 'Accuracy']
-
-        pandas.set_option('display.width', 1000)
-        print pandas.DataFrame(results, columns=header, index=range(len(results)))
+        return ModelSearch.search(data, labels, numFolds, numProcesses, maxTime, numCandidates)
@@ -0,0 +1,205 @@
+"""
+Per-stage timing and profiling of queries.
+
+Each stage (network, parse, extract, preProcess, pca, knn, svm, ...) of each source
+records wall time, number of calls and bytes handled. Timing is off by default and
+can be switched on at runtime with 'enable()' or at startup with the environment
+variable GRADINFO_PROFILE ('timing', or 'cprofile' to also profile parsing).
+"""
+
+import contextlib
+import cProfile
+import functools
+import os
+import pstats
+import threading
+import time
+
+# Settings
+
+enabled        = os.environ.get('GRADINFO_PROFILE', '') in ['timing', 'cprofile']
+profileParsing = os.environ.get('GRADINFO_PROFILE', '') == 'cprofile'
+profiledStages = ['parse', 'extract']  # Stages run under cProfile if 'profileParsing' is set
+profileDir     = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cache', 'profiles')
+
+# Recorded [calls, seconds, bytes] for each (source, stage)
+stats = dict()
+
+# cProfile snapshots of profiled stages ('cProfile.Profile's, or 'Snapshot's of profiles recorded elsewhere)
+profiles = list()
+
+lock = threading.Lock()
+
+# State of the current thread ('background' is set on threads working outside of any query, see 'background')
+local = threading.local()
+
+# Stats of a cProfile snapshot taken elsewhere (e.g. in a worker process), read by 'pstats' like a 'cProfile.Profile'
+class Snapshot:
+
+    # Constructor
+    def __init__(self, stats):
+        self.stats = stats
+
+    def create_stats(self):
+        pass
+
+# Switches timing on, optionally with cProfile snapshots of the parsing stages
+def enable(withProfiles=False):
+    global enabled, profileParsing
+    enabled = True
+    profileParsing = withProfiles
+
+# Switches timing and profiling off
+def disable():
+    global enabled, profileParsing
+    enabled = False
+    profileParsing = False
+
+# Forgets everything recorded so far
+def reset():
+    with lock:
+        stats.clear()
+        del profiles[:]
+
+# Returns a function calling 'function' with nothing recorded on its thread, for work done outside
+# of any query (e.g. loading rankings ahead of use) that would otherwise show in the report of the query running
+def background(function):
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        local.background = True
+        try:
+            return function(*args, **kwargs)
+        finally:
+            local.background = False
+    return wrapper
+
+# Returns whether stages of the current thread are recorded
+def isRecording():
+    return enabled and not getattr(local, 'background', False)
+
+# Records one call of a stage that took 'seconds' and handled 'numBytes'
+def record(source, stage, seconds, numBytes=0, profile=None):
+    if not isRecording():
+        return
+
+    with lock:
+        entry = stats.setdefault((source, stage), [0, 0.0, 0])
+        entry[0] += 1
+        entry[1] += seconds
+        entry[2] += numBytes
+
+        if profile:
+            profiles.append(profile)
+
+# Returns a copy of the recorded [calls, seconds, bytes] for each (source, stage)
+def getStats():
+    with lock:
+        return dict((key, list(entry)) for key, entry in stats.items())
+
+# Returns the stats (see 'pstats') of each cProfile snapshot, which unlike the snapshots can be pickled
+def getProfileStats():
+    with lock:
+        snapshots = list(profiles)
+
+    profileStats = list()
+
+    for profile in snapshots:
+        profile.create_stats()
+        profileStats.append(profile.stats)
+
+    return profileStats
+
+# Adds stats and cProfile snapshot stats (see 'getProfileStats') recorded elsewhere (e.g. in a worker process,
+# see 'ParsePool') to the recorded ones
+def merge(otherStats, otherProfileStats=()):
+    if not isRecording():
+        return
+
+    with lock:
+        for key, (calls, seconds, numBytes) in otherStats.items():
+            entry = stats.setdefault(key, [0, 0.0, 0])
+            entry[0] += calls
+            entry[1] += seconds
+            entry[2] += numBytes
+
+        profiles.extend(Snapshot(profileStats) for profileStats in otherProfileStats)
+
+# Context manager timing the enclosed block as one call of a stage
+@contextlib.contextmanager
+def stage(source, name, numBytes=0):
+    if not isRecording():
+        yield
+        return
+
+    profile = None
+
+    if profileParsing and name in profiledStages:
+        profile = cProfile.Profile()
+        profile.enable()
+
+    start = time.time()
+
+    try:
+        yield
+    finally:
+        elapsed = time.time() - start
+
+        if profile:
+            profile.disable()
+
+        record(source, name, elapsed, numBytes, profile)
+
+# Decorator timing every call of a function as one call of a stage
+def timed(source, name):
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with stage(source, name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+# Returns a report of the recorded stages, slowest first
+def getReport():
+    with lock:
+        entries = sorted(stats.items(), key=lambda item: -item[1][1])
+
+    lines = list()
+    lines.append('{:<14}{:<12}{:>8}{:>12}{:>14}'.format('Source', 'Stage', 'Calls', 'Time (s)', 'Bytes'))
+
+    for (source, name), (calls, seconds, numBytes) in entries:
+        lines.append('{:<14}{:<12}{:>8}{:>12.3f}{:>14}'.format(source, name, calls, seconds, numBytes))
+
+    return '\n'.join(lines)
+
+# Prints the report of the recorded stages and saves cProfile snapshots if any
+def printReport():
+    if not enabled:
+        return
+
+    print "\n    Time spent in each stage:\n"
+    print getReport()
+
+    path = dumpProfiles()
+    if path:
+        print "\n    Profile of parsing saved to " + path + " (view with 'python -m pstats')"
+
+    print ""
+
+# Saves the merged cProfile snapshots to a file and returns its path (None if there are none)
+def dumpProfiles():
+    with lock:
+        if not profiles:
+            return None
+
+        merged = pstats.Stats(profiles[0])
+        for profile in profiles[1:]:
+            merged.add(profile)
+
+    if not os.path.isdir(profileDir):
+        os.makedirs(profileDir)
+
+    path = os.path.join(profileDir, time.strftime('%Y%m%d-%H%M%S') + '.prof')
+    merged.dump_stats(path)
+
+    return path
@@ -2,8 +2,20 @@
 Contains common constants and functions useful for querying data
 """
 
+import os
 import requests
+import HttpClient
+import Profiler
 import re
+import lxml.etree
+import lxml.html
+import numpy as np
+
+from bs4 import BeautifulSoup
+
+# Read only the needed parts of pages straight from lxml trees instead of building whole BeautifulSoup
+# trees, where a scraper has such a fast path (set the environment variable GRADINFO_FULL_PARSE to turn it off)
+fastParse = not os.environ.get('GRADINFO_FULL_PARSE')
 
 # Query keys
 
@@ -38,6 +50,27 @@ def normalizeGre(score):
 def normalizeGpa(achievedGpa, maxPossibleGpa):
     return float(achievedGpa) / float(maxPossibleGpa)
 
+# Array version of 'normalizeGre' for whole columns of scores
+def normalizeGreArray(scores):
+    scores = np.asarray(scores, dtype=np.float)
+    return np.where(scores > 200, scores / 800.0, scores / 170.0)
+
+# Parses HTML fetched from given source, timed as its 'parse' stage
+def parseHtml(content, source):
+    with Profiler.stage(source, 'parse', len(content)):
+        return BeautifulSoup(content, "lxml")
+
+# Parses HTML fetched from given source into an lxml tree (None if there is no document), timed as its 'parse' stage
+def parseTree(content, source):
+    with Profiler.stage(source, 'parse', len(content)):
+        try:
+            return lxml.html.document_fromstring(content)
+        except ValueError:
+            # Unicode strings with an encoding declaration must be given as bytes
+            return lxml.html.document_fromstring(content.encode('utf-8'))
+        except lxml.etree.ParserError:
+            return None
+
 # Searches text for given keywords
 def searchKeywords(text, negativeKeywords, positiveKeywords):
     text = text.lower()
@@ -54,6 +87,14 @@ def searchKeywords(text, negativeKeywords, positiveKeywords):
 
     return 0
 
+# Returns a (school, major, degree) tuple that is the same for equivalent queries
+def normalizeQuery(query):
+    return tuple(' '.join(query.get(key, '').lower().split()) for key in [schoolKey, majorKey, degreeKey])
+
+# Returns the school or major name in lower case with punctuation replaced by spaces
+def normalizeName(name):
+    return ' '.join(re.sub(r'[^\w]+', ' ', name.lower(), flags=re.UNICODE).split())
+
 # Modifies the original query to produce better results
 def refineQuery(query):
     if query[majorKey].lower() == 'economics':
@@ -65,7 +106,10 @@ def google(query):
     query = '+'.join(query.split())
     link = 'http://www.google.com/search?q=' + query
     ua = {'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_8_2) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/27.0.1453.116 Safari/537.36'}
-    response = requests.get(link, headers=ua).text
+    try:
+        response = HttpClient.get(link, headers=ua, source='Google')
+    except requests.RequestException:
+        return None
     matches = re.finditer(r'<a href="((?:(?!onmousedown|href).)*)" onmousedown', response)
     if matches:
         for match in matches:
@@ -0,0 +1,214 @@
+"""
+Long-running HTTP service answering the GradInfo menu options as JSON.
+
+One process keeps the imported modules, the HTTP connection pool, the session cache
+of parsed pages and posts, the rankings and the fitted Predictor models in memory, so
+only the first query of a kind starts cold:
+
+    python Service.py --port 8467
+
+    GET /rankings?area=Engineering
+    GET /faculty?school=Johns+Hopkins+University&major=Computer+Science
+    GET /students?school=...&major=...
+    GET /admissions?school=...&major=...&degree=PhD
+    GET /prediction?school=...&major=...&degree=PhD
+    GET /status
+
+Each answer has the query, its 'records' (see 'Options.py') and the seconds taken.
+Identical queries arriving while one is running wait for it and share its records.
+"""
+
+import argparse
+import json
+import threading
+import time
+import urlparse
+import Options
+import ParsePool
+import QueryUtil
+import UsNews
+
+from BaseHTTPServer import BaseHTTPRequestHandler
+from BaseHTTPServer import HTTPServer
+from SocketServer import ThreadingMixIn
+
+# Number of distinct queries running at the same time (others wait for one to finish)
+maxQueries = 8
+
+# Option of each path, and the parameters its query needs
+paths = dict(('/' + name, option) for option, name in Options.names.items())
+
+requiredParams = {
+    1 : ['area'],
+    2 : [QueryUtil.schoolKey, QueryUtil.majorKey],
+    3 : [QueryUtil.schoolKey, QueryUtil.majorKey],
+    4 : [QueryUtil.schoolKey, QueryUtil.majorKey, QueryUtil.degreeKey],
+    5 : [QueryUtil.schoolKey, QueryUtil.majorKey, QueryUtil.degreeKey],
+}
+
+# A query being run and what it returned, shared by the requests asking for it
+class Call:
+
+    # Constructor
+    def __init__(self):
+        self.done = threading.Event()
+        self.records = None     # Records returned by 'Options.run'
+        self.error = None       # Exception raised by 'Options.run', if any
+
+# Multi-threaded server running the queries of its requests and keeping request counts
+class Service(ThreadingMixIn, HTTPServer):
+
+    daemon_threads = True
+
+    # Constructor
+    def __init__(self, host, port, maxQueries=maxQueries):
+        HTTPServer.__init__(self, (host, port), RequestHandler)
+        self.started = time.time()
+        self.numRequests = 0
+        self.numShared = 0          # Requests answered by a query another request started
+        self.inFlight = dict()      # Calls of the queries being run, by key
+        self.lock = threading.Lock()
+        self.slots = threading.BoundedSemaphore(maxQueries)
+
+    # Returns the base URL of the service
+    def getUrl(self):
+        return 'http://' + self.server_address[0] + ':' + str(self.server_address[1])
+
+    # Returns the records of the option for the query, joining an identical query that is running if there is one
+    def runQuery(self, option, query):
+        key = (option,) + QueryUtil.normalizeQuery(query)
+
+        with self.lock:
+            call = self.inFlight.get(key)
+            isRunning = call is not None
+
+            if isRunning:
+                self.numShared += 1
+            else:
+                call = Call()
+                self.inFlight[key] = call
+
+        if isRunning:
+            call.done.wait()
+        else:
+            try:
+                with self.slots:
+                    call.records = Options.run(option, query)
+            except Exception as e:
+                call.error = e
+            finally:
+                with self.lock:
+                    del self.inFlight[key]
+                call.done.set()
+
+        if call.error is not None:
+            raise call.error
+
+        return call.records
+
+    # Returns a dictionary describing the state of the service
+    def getStatus(self):
+        with self.lock:
+            status = dict()
+            status['uptime']      = time.time() - self.started
+            status['numRequests'] = self.numRequests
+            status['numShared']   = self.numShared
+            status['inFlight']    = len(self.inFlight)
+            return status
+
+# Answers each request with the records of its query as JSON
+class RequestHandler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        url = urlparse.urlparse(self.path)
+        params = dict((key, values[0]) for key, values in urlparse.parse_qs(url.query).items())
+
+        with self.server.lock:
+            self.server.numRequests += 1
+
+        if url.path == '/status':
+            self.sendJson(200, self.server.getStatus())
+            return
+
+        option = paths.get(url.path)
+
+        if option is None:
+            self.sendJson(404, { 'error' : 'Unknown path, use one of ' + ', '.join(sorted(paths)) + ' or /status' })
+            return
+
+        missing = [param for param in requiredParams[option] if not params.get(param, '').strip()]
+
+        if missing:
+            self.sendJson(400, { 'error' : 'Missing parameters: ' + ', '.join(missing) })
+            return
+
+        # Option 1 takes the area in place of the major
+        query = dict()
+        query[QueryUtil.schoolKey] = params.get(QueryUtil.schoolKey, '')
+        query[QueryUtil.majorKey]  = params.get('area', '') if option == 1 else params.get(QueryUtil.majorKey, '')
+        query[QueryUtil.degreeKey] = params.get(QueryUtil.degreeKey, '')
+
+        answer = dict(query)
+        answer['option'] = option
+        answer['name']   = Options.names[option]
+
+        start = time.time()
+
+        try:
+            answer['records'] = self.server.runQuery(option, query)
+            status = 200
+        except Options.OptionError as e:
+            answer['error'] = str(e)
+            status = 400
+        except Exception as e:
+            answer['error'] = str(e) or e.__class__.__name__
+            status = 500
+
+        answer['seconds'] = time.time() - start
+
+        self.sendJson(status, answer)
+
+    # Sends a value as JSON with the given status
+    def sendJson(self, status, value):
+        content = json.dumps(value, sort_keys=True)
+
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    # Keeps the console quiet
+    def log_message(self, format, *args):
+        pass
+
+# Starts the service on a background thread and returns it (port 0 picks a free port)
+def start(host='localhost', port=0, maxQueries=maxQueries):
+    service = Service(host, port, maxQueries)
+
+    thread = threading.Thread(target=service.serve_forever)
+    thread.daemon = True
+    thread.start()
+
+    return service
+
+def main():
+    parser = argparse.ArgumentParser(description='HTTP service answering the GradInfo menu options as JSON')
+    parser.add_argument('--host', default='localhost')
+    parser.add_argument('--port', type=int, default=8467)
+    parser.add_argument('--max-queries', type=int, default=maxQueries, help='number of distinct queries running at the same time')
+    args = parser.parse_args()
+
+    # Start the parse processes before any other thread is running
+    ParsePool.start()
+
+    service = Service(args.host, args.port, args.max_queries)
+
+    # Load rankings in the background so the first requests answer from memory
+    UsNews.prefetch()
+
+    print "Serving GradInfo on " + service.getUrl()
+    service.serve_forever()
+
+if __name__ == '__main__':
+    main()
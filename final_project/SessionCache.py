@@ -0,0 +1,57 @@
+"""
+In-memory cache of results scraped during this session.
+
+Parsed GradCafe pages are kept by normalized query, page size and page number, and parsed
+GoHackers posts by school and post ID, so that a later menu option for the same query
+(e.g. option 5 after option 4) only fetches what the earlier one did not. Entries are
+forgotten after 'maxAge' seconds so a long session still sees new posts.
+"""
+
+import collections
+import threading
+import time
+
+# Settings
+
+enabled    = True     # Whether entries are kept (off to measure the scrapers, see LoadTest.py)
+maxAge     = 30 * 60  # Seconds an entry is reused for
+maxEntries = 10000    # Entries kept before the oldest ones are forgotten
+
+# (time stored, value) of each key, oldest first
+entries = collections.OrderedDict()
+
+lock = threading.Lock()
+
+# Returns the value stored for the key, or None if there is none or it is too old
+def get(key):
+    if not enabled:
+        return None
+
+    with lock:
+        entry = entries.get(key)
+
+        if entry is None:
+            return None
+
+        if time.time() - entry[0] >= maxAge:
+            del entries[key]
+            return None
+
+        return entry[1]
+
+# Stores a value for the key, forgetting the oldest entries if there are too many
+def put(key, value):
+    if not enabled:
+        return
+
+    with lock:
+        entries.pop(key, None)
+        entries[key] = (time.time(), value)
+
+        while len(entries) > maxEntries:
+            entries.popitem(last=False)
+
+# Forgets every entry
+def clear():
+    with lock:
+        entries.clear()
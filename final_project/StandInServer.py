@@ -0,0 +1,252 @@
+# -*- coding: utf-8 -*-
+"""
+Local HTTP server that stands in for GradCafe, GoHackers, Indeed and US News.
+
+Pages are generated in the formats the scrapers parse, with configurable page
+counts, latency and error rates, so that throughput, concurrency and failure
+handling can be tested without network access:
+
+    python StandInServer.py --port 8466 --latency 0.2 --error-rate 0.05
+
+Point the scrapers at the server with 'pointScrapers("http://localhost:8466")'.
+"""
+
+import argparse
+import random
+import threading
+import time
+import urlparse
+import GoHackers
+import GradCafe
+import StudentInfo
+import SyntheticData
+import UsNews
+
+from BaseHTTPServer import BaseHTTPRequestHandler
+from BaseHTTPServer import HTTPServer
+from SocketServer import ThreadingMixIn
+
+schools = ['Johns Hopkins University', 'Carnegie Mellon University', 'Stanford University',
+           'University Of Maryland, College Park', 'Cornell University', 'Princeton University']
+
+cities = ['Baltimore, MD', 'Pittsburgh, PA', 'Stanford, CA', 'College Park, MD', 'Ithaca, NY', 'Princeton, NJ']
+
+# Settings of the stand-in sites
+class Settings:
+
+    # Constructor
+    def __init__(self, latency=0.0, jitter=0.0, errorRate=0.0, numGradCafePages=5, numGoHackersPosts=200, numResumes=20, numRankings=20):
+        self.latency           = latency            # Mean seconds before each response
+        self.jitter            = jitter             # Standard deviation of the latency
+        self.errorRate         = errorRate          # Fraction of requests answered with '500 Internal Server Error'
+        self.numGradCafePages  = numGradCafePages   # Number of result pages of every GradCafe search (of 250 results)
+        self.numGoHackersPosts = numGoHackersPosts  # Number of posts of every GoHackers search
+        self.numResumes        = numResumes         # Number of resumes of every Indeed search
+        self.numRankings       = numRankings        # Number of schools of every US News ranking
+
+# Multi-threaded server keeping its settings and request counts
+class StandInServer(ThreadingMixIn, HTTPServer):
+
+    daemon_threads = True
+
+    # Constructor
+    def __init__(self, port, settings):
+        HTTPServer.__init__(self, ('localhost', port), RequestHandler)
+        self.settings = settings
+        self.numRequests = 0
+        self.numErrors = 0
+        self.lock = threading.Lock()
+
+    # Returns the base URL of the server
+    def getUrl(self):
+        return 'http://localhost:' + str(self.server_address[1])
+
+# Serves a generated page for each request
+class RequestHandler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        settings = self.server.settings
+
+        url = urlparse.urlparse(self.path)
+        params = dict((key, values[0]) for key, values in urlparse.parse_qs(url.query).items())
+
+        if settings.latency > 0 or settings.jitter > 0:
+            time.sleep(max(random.gauss(settings.latency, settings.jitter), 0))
+
+        failed = random.random() < settings.errorRate
+
+        with self.server.lock:
+            self.server.numRequests += 1
+            if failed:
+                self.server.numErrors += 1
+
+        if failed:
+            self.send_error(500)
+            return
+
+        if url.path == '/survey/index.php':
+            page = renderGradCafePage(settings, params.get('q', ''), int(params.get('pp', 100)), int(params.get('p', 1)))
+        elif params.get('r') == 'gohackers' and 'uid' in params:
+            page = renderGoHackersPost(int(params['uid']))
+        elif params.get('r') == 'gohackers':
+            page = renderGoHackersListing(settings, params.get('orderby', 'asc'), int(params.get('recnum', 15)), int(params.get('p', 1)))
+        elif url.path == '/resumes':
+            page = renderIndeedSearch(settings)
+        elif url.path.startswith('/r/'):
+            page = renderIndeedResume(url.path.split('/')[2])
+        elif url.path.startswith('/best-graduate-schools/'):
+            page = renderUsNewsRanking(settings)
+        else:
+            self.send_error(404)
+            return
+
+        content = page.encode('utf-8')
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    # Keeps the console quiet
+    def log_message(self, format, *args):
+        pass
+
+# Returns a GradCafe survey page with 'perPage' results
+# Results are the same whatever the page size, as on GradCafe
+def renderGradCafePage(settings, query, perPage, page):
+    numResults = settings.numGradCafePages * 250
+    numPages = (numResults + perPage - 1) / perPage
+
+    school = ' '.join(query.split('+')[:3]).title() + ' University'
+    rows = list()
+
+    for i in range((page - 1) * perPage, min(page * perPage, numResults)):
+        rand = random.Random(query + str(i))
+        result = SyntheticData.generateGradResult(rand, i)
+        decision = 'Accepted' if result['decision'] else rand.choice(['Rejected', 'Wait listed'])
+        degree = rand.choice(['PhD', 'Masters'])
+        notes = rand.choice(['', 'Two years of work experience in industry.', 'Undergrad research, one paper.', 'No research experience.'])
+
+        rows.append(u'<tr><td>{}</td><td>Computer Science, {} (F16)</td>'
+                    u'<td>{} via E-mail on 15 Feb 2016 <a class="extinfo" href="#"><span>Undergrad GPA: {:.2f}<br/>'
+                    u'GRE General (V/Q/W): {:.0f}/{:.0f}/{:.2f}<br/></span></a></td>'
+                    u'<td>{}</td><td>16 Feb 2016</td><td>{}</td></tr>'.format(
+                        school, degree, decision, max(result['gpaScore'], 2.0), result['greVerbal'], result['greQuant'],
+                        result['greWriting'], 'I' if result['status'] else 'A', notes))
+
+    pages = u' '.join(u'<a href="index.php?p={0}">{0}</a>'.format(p) for p in range(2, numPages + 1))
+
+    return (u'<html><body><div class="pagination"><strong>1</strong> {}</div>'
+            u'<table><tr><td>Institution</td><td>Program (Season)</td><td>Decision &amp; Date</td><td>St1</td><td>Date Added</td><td>Notes</td></tr>'
+            u'{}</table></body></html>').format(pages, u''.join(rows))
+
+# Returns a GoHackers listing page with 5 notices followed by 'recnum' posts
+def renderGoHackersListing(settings, orderby, recnum, page):
+    total = settings.numGoHackersPosts
+
+    # Like the real board, "asc" (the default) lists the newest post (highest uid) first
+    numbers = range(total, 0, -1)
+    if orderby == 'desc':
+        numbers.reverse()
+
+    rows = list()
+
+    for i in range(5):
+        rows.append(u'<tr><td>공지</td><td class="sbj"><a href="/?r=gohackers&amp;uid={}"><b>[공지] 안내 {}</b></a></td></tr>'.format(900000 + i, i))
+
+    for number in numbers[(page - 1) * recnum:page * recnum]:
+        rows.append(u'<tr><td>{}</td><td class="sbj"><a href="/?r=gohackers&amp;m=bbs&amp;bid=admission&amp;uid={}">[합격] 합격 후기 {}</a></td></tr>'.format(
+            number, 500000 + number, number))
+
+    return u'<html><body><table>{}</table></body></html>'.format(u''.join(rows))
+
+# Returns a GoHackers post
+def renderGoHackersPost(uid):
+    rand = random.Random(uid)
+
+    gpa, verbal, quant, writing, decision = SyntheticData.generateScores(rand)
+    maxPossibleGpa = rand.choice([4.0, 4.3, 4.5])
+
+    admitted = rand.sample(schools, rand.randint(0, 3))
+    experience = rand.choice([u'학부 연구생 2년', u'회사 인턴 6개월', u'학부 연구생 1년, 인턴 3개월', u'없음'])
+
+    return (u'<html><body><table>'
+            u'<tr><td id="content_1">{}</td></tr>'
+            u'<tr><td id="content_4">GPA {:.2f}/{}</td></tr>'
+            u'<tr><td id="content_5">GRE V{}/Q{}/AW{}</td></tr>'
+            u'<tr><td id="content_7">{}</td></tr>'
+            u'</table></body></html>').format(', '.join(admitted), gpa * maxPossibleGpa, maxPossibleGpa, verbal, quant, writing, experience)
+
+# Returns an Indeed resume search page
+def renderIndeedSearch(settings):
+    items = list()
+
+    for i in range(settings.numResumes):
+        items.append(u'<li class="sre" id="{:016x}"><div class="app_name"><a href="#">Student {}</a></div></li>'.format(i + 1, i + 1))
+
+    return u'<html><body><ol>{}</ol></body></html>'.format(u''.join(items))
+
+# Returns an Indeed resume
+def renderIndeedResume(name):
+    rand = random.Random(name)
+
+    school = rand.choice(schools)
+    city = cities[schools.index(school)]
+
+    return (u'<html><body><h1 id="resume-contact">{}</h1><h2 id="headline">PhD Candidate - {}</h2><p id="headline_location">{}</p>'
+            u'<div class="section-item workExperience-content"><div class="data_display"><p class="work_title title">Research Assistant</p>'
+            u'<div class="work_company"><span class="bold">{}</span><div class="inline-block">{}</div></div><p class="work_dates">2013 to Present</p></div></div>'
+            u'<div class="section-item education-content"><div class="data_display"><p class="edu_title">PhD in Computer Science</p>'
+            u'<span itemprop="name">{}</span><span itemprop="addressLocality">{}</span><p class="edu_dates">2013 to Present</p></div></div>'
+            u'<div class="section-item links-content"><p class="link_url"><a href="#">http://www.example.edu/~{}</a></p></div>'
+            u'</body></html>').format(name.replace('-', ' '), school, city, school, city, school, city, name.lower())
+
+# Returns a US News ranking page
+def renderUsNewsRanking(settings):
+    rows = list()
+
+    for i in range(settings.numRankings):
+        name = schools[i % len(schools)] + ('' if i < len(schools) else ' ' + str(i / len(schools) + 1))
+
+        rows.append(u'<tr><td><a class="school-name" href="#">{}</a><p class="location">{}</p></td><td class="search_tuition">${},000 per year</td></tr>'.format(
+            name, cities[i % len(cities)], 40 + i))
+
+    return u'<html><body><table>{}</table></body></html>'.format(u''.join(rows))
+
+# Points every scraper at the given base URL
+def pointScrapers(url):
+    GradCafe.baseUrl    = url
+    GoHackers.baseUrl   = url
+    StudentInfo.baseUrl = url
+    UsNews.baseUrl      = url
+
+# Starts a server on a background thread and returns it (port 0 picks a free port)
+def start(port=0, settings=None):
+    server = StandInServer(port, settings or Settings())
+
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+
+    return server
+
+def main():
+    parser = argparse.ArgumentParser(description='Stand-in server for GradCafe, GoHackers, Indeed and US News')
+    parser.add_argument('--port', type=int, default=8466)
+    parser.add_argument('--latency', type=float, default=0.0, help='mean seconds before each response')
+    parser.add_argument('--jitter', type=float, default=0.0, help='standard deviation of the latency')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fraction of requests that fail with status 500')
+    parser.add_argument('--gradcafe-pages', type=int, default=5)
+    parser.add_argument('--gohackers-posts', type=int, default=200)
+    parser.add_argument('--resumes', type=int, default=20)
+    args = parser.parse_args()
+
+    settings = Settings(args.latency, args.jitter, args.error_rate, args.gradcafe_pages, args.gohackers_posts, args.resumes)
+    server = StandInServer(args.port, settings)
+
+    print "Serving stand-in sites on " + server.getUrl()
+    server.serve_forever()
+
+if __name__ == '__main__':
+    main()
@@ -4,66 +4,134 @@ Scrapes school official website for a list of current students and their backgro
 
 import re
 import requests
+import HttpClient
 import pandas
 import json
 import QueryUtil
-from bs4 import BeautifulSoup
+import Profiler
+
+from multiprocessing.pool import ThreadPool
+
+# Site to scrape (can be pointed at a stand-in server, see 'StandInServer.py')
+baseUrl = "http://www.indeed.com"
+
+# Number of resumes fetched at the same time
+numWorkers = 8
+
+# Number of result pages read for a search, and number of resumes on each page
+maxPages = 5
+perPage = 50
 
 # The parameter 'query' is a dictionary of query information,
 # for example, { 'school' : 'Johns Hopkins', 'major' : computer science }
 # The function will run the query with school name and major. However,
 # if there is no result that matches the query, it will rerun the query with
-# school name only.
+# school name only. Both searches are sent at once, so the one with school
+# name only is ready by the time the first one comes back empty.
 
 # ============================
 # Get Results using Indeed.com
 # ============================
 def getResults(query) :
+    for result in iterResults(query, True) :
+        printResult(result)
+
+# Generator of the resumes of the query (dictionaries as returned by 'scrape_resume'),
+# yielded as each of them arrives. What is searched is printed if doPrint is set
+def iterResults(query, doPrint=False) :
     school = query[QueryUtil.schoolKey]
     major = query[QueryUtil.majorKey]
 
-    # get HTML content
-    soup = getContent(school, major)
+    # get HTML content of both searches
+    pool = ThreadPool(2)
+    searches = [pool.apply_async(getContent, (school, major)), pool.apply_async(getContent, (school,))]
+    pool.close()
+
+    soup = searches[0].get()
   
     # find links of result resume and get specific information from resume
     if soup.find_all("li", class_="sre") :
-        printResume(soup)
+        for result in fetchResumes(soup, school, major) :
+            yield result
     else :
-        print "========================================================"
-        print "No Result is Found. Now searching only with school name."
-        print "========================================================"
-        print
-        soup = getContent(school)
+        if doPrint :
+            print "========================================================"
+            print "No Result is Found. Now searching only with school name."
+            print "========================================================"
+            print
+        soup = searches[1].get()
         if soup.find_all("li", class_="sre") :
-            printResume(soup)
-        else :
+            for result in fetchResumes(soup, school) :
+                yield result
+        elif doPrint :
             print "======================================================="
             print "No Result Available, Please try with different school! "
             print "======================================================="
-# Helper function to get html content
-def getContent(schoolName, major="") :
+# Helper function to get html content ('start' is the number of results on earlier pages)
+def getContent(schoolName, major="", start=0) :
     if len(major) > 0 :
         q = "q=title%3A%28phd candidate%29 school:%28" + schoolName + "%29 fieldofstudy:%28" + major + "%29"
     else :
         q = "q=title%3A%28phd candidate%29 school:%28" + schoolName + "%29"
         
-    webpage = "http://www.indeed.com/resumes?co=US&" + q
+    webpage = baseUrl + "/resumes?co=US&" + q
+
+    if start > 0 :
+        webpage += "&start=" + str(start)
 
-    # get HTML content
-    html_content = requests.get(webpage).text
-    soup = BeautifulSoup(html_content, "lxml")
+    # get HTML content (an empty page if Indeed could not be reached)
+    try :
+        html_content = HttpClient.get(webpage, source='StudentInfo')
+    except requests.RequestException as e :
+        html_content = ""
+    soup = QueryUtil.parseHtml(html_content, 'StudentInfo')
 
     return soup
 
-# Helper function to find link for each resume and calls scrape_resume function
-def printResume(soup) :
-    for link in soup.find_all("li", class_="sre") :
-        postId = link.get("id")
-        name = link.find("div","app_name").find("a").text
-        name = name.replace(" ", "-")
-        link = "http://www.indeed.com/r/" + name + "/" + postId
-        result = scrape_resume(link)
-        printResult(result)
+# Helper function to fetch the resumes of the search starting with the page in 'soup'
+# Resumes are fetched 'numWorkers' at a time and yielded as each of them arrives
+def fetchResumes(soup, schoolName, major="") :
+    pool = ThreadPool(numWorkers)
+    try :
+        for result in pool.imap_unordered(fetchResume, getResumeLinks(soup, schoolName, major)) :
+            if result is not None :
+                yield result
+    finally :
+        pool.terminate()
+
+# Helper function to find link for each resume, reading up to 'maxPages' pages of the search
+# Later pages are requested while resumes of earlier pages are being fetched
+def getResumeLinks(soup, schoolName, major="") :
+    seen = set()
+    page = 1
+
+    while True :
+        links = soup.find_all("li", class_="sre")
+        numNew = 0
+
+        for link in links :
+            postId = link.get("id")
+            if postId in seen :
+                continue # Indeed repeats the last page past the end of the results
+            seen.add(postId)
+            numNew += 1
+
+            name = link.find("div","app_name").find("a").text
+            name = name.replace(" ", "-")
+            yield baseUrl + "/r/" + name + "/" + postId
+
+        if numNew == 0 or len(links) < perPage or page >= maxPages :
+            break
+
+        soup = getContent(schoolName, major, page * perPage)
+        page += 1
+
+# Helper function to get information from a resume, or None if it cannot be fetched
+def fetchResume(url) :
+    try :
+        return scrape_resume(url)
+    except requests.RequestException as e :
+        return None # skip resumes that time out
         
 
         
@@ -101,8 +169,16 @@ def printResult(result):
     
 # Helper function to grap information from a resume
 def scrape_resume(url) :
-    html_content = requests.get(url).text
-    soup = BeautifulSoup(html_content, "lxml")
+    html_content = HttpClient.get(url, source='StudentInfo')
+    return parseResume(html_content)
+
+# Helper function to grap information from the HTML of a resume
+def parseResume(html_content) :
+    return extractResume(QueryUtil.parseHtml(html_content, 'StudentInfo'))
+
+# Helper function to grap information from the parsed HTML of a resume
+@Profiler.timed('StudentInfo', 'extract')
+def extractResume(soup) :
     person = {}
     item = ['name','job_title','location', 'education', 'webpage', 'work_experience']
     
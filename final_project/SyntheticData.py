@@ -0,0 +1,76 @@
+"""
+Generates synthetic admission results as returned by GradCafe and GoHackers
+"""
+
+import math
+import random
+import AdmissionRecord
+import QueryUtil
+
+# Returns a tuple of (GradCafe, GoHackers) results with 'numResults' results in total
+# About 10% of the results have missing scores, like the scraped data
+def generateResults(numResults, seed=None):
+    rand = random.Random(seed)
+
+    gradResults = list()
+    goResults = list()
+
+    for i in range(numResults):
+        if i % 2 == 0:
+            gradResults.append(generateGradResult(rand, i))
+        else:
+            goResults.append(generateGoResult(rand, i))
+
+    return (gradResults, goResults)
+
+# Returns a result as returned by 'GradCafe.getResults' (GPA out of 4.0)
+def generateGradResult(rand, postId):
+    gpa, verbal, quant, writing, decision = generateScores(rand)
+
+    return AdmissionRecord.AdmissionRecord(decision   = decision,
+                                           gpaScore   = round(gpa * 4.0, 2) if rand.random() > 0.05 else 0.0,
+                                           greVerbal  = verbal,
+                                           greQuant   = quant,
+                                           greWriting = writing,
+                                           workExp    = rand.randint(0, 1),
+                                           research   = rand.randint(0, 1),
+                                           status     = rand.randint(0, 1),
+                                           postId     = 'gc{}'.format(postId))
+
+# Returns a result as returned by 'GoHackers.getResults' (scores parsed from strings, GPA from "achieved/maximum")
+def generateGoResult(rand, postId):
+    gpa, verbal, quant, writing, decision = generateScores(rand)
+
+    maxPossibleGpa = rand.choice([4.0, 4.3, 4.5])
+
+    gpaScore, gpaScale = AdmissionRecord.parseGpa('{:.2f}/{}'.format(gpa * maxPossibleGpa, maxPossibleGpa) if rand.random() > 0.05 else 0)
+
+    return AdmissionRecord.AdmissionRecord(decision   = decision,
+                                           gpaScore   = gpaScore,
+                                           gpaScale   = gpaScale,
+                                           greVerbal  = AdmissionRecord.parseScore(str(verbal) if rand.random() > 0.05 else 0),
+                                           greQuant   = AdmissionRecord.parseScore(str(quant)),
+                                           greWriting = AdmissionRecord.parseScore(str(writing)),
+                                           workExp    = rand.randint(0, 1),
+                                           research   = rand.randint(0, 1),
+                                           status     = 1,
+                                           postId     = str(500000 + postId))
+
+# Returns (normalized GPA, GRE verbal, GRE quant, GRE writing, decision) where better scores are more likely accepted
+def generateScores(rand):
+    gpa = min(rand.gauss(0.85, 0.08), 1.0)
+    writing = rand.choice([3.0, 3.5, 4.0, 4.5, 5.0])
+
+    if rand.random() < 0.8:
+        # New GRE
+        verbal = int(min(max(rand.gauss(155, 8), 130), 170))
+        quant  = int(min(max(rand.gauss(162, 6), 130), 170))
+    else:
+        # Old GRE
+        verbal = int(min(max(rand.gauss(560, 90), 200), 800)) / 10 * 10
+        quant  = int(min(max(rand.gauss(760, 40), 200), 800)) / 10 * 10
+
+    strength = 8.0 * (gpa - 0.85) + 0.1 * (QueryUtil.normalizeGre(quant) * 170 - 162) + rand.gauss(0, 1)
+    decision = 1 if rand.random() < 1.0 / (1.0 + math.exp(-strength)) else 0
+
+    return (gpa, verbal, quant, writing, decision)
@@ -1,49 +1,181 @@
+"""
+US News graduate school rankings of each field, parsed into records and cached on disk
+"""
+
+import os
 import re
+import json
+import threading
+import time
 import requests
-from bs4 import BeautifulSoup
+import DiskCache
+import HttpClient
+import Profiler
+import QueryUtil
 
-def getTop20(industry) :
-	url = ""
-	if (industry.lower() == "business") :
-		url = "http://grad-schools.usnews.rankingsandreviews.com/best-graduate-schools/top-business-schools/mba-rankings"
-	elif (industry.lower() == "education") :
-		url = "http://grad-schools.usnews.rankingsandreviews.com/best-graduate-schools/top-education-schools/edu-rankings"
-	elif (industry.lower() == "engineering") :
-		url = "http://grad-schools.usnews.rankingsandreviews.com/best-graduate-schools/top-engineering-schools/eng-rankings"
-	elif (industry.lower() == "law") :
-		url = "http://grad-schools.usnews.rankingsandreviews.com/best-graduate-schools/top-law-schools/law-rankings"
-	elif (industry.lower() == "medicine") :
-		# medicine has two differnt ranking system. 1: research, 2: primary care (default: 1)
-
-		# research
-		url = "http://grad-schools.usnews.rankingsandreviews.com/best-graduate-schools/top-medical-schools/research-rankings"
-
-		# primary care
-		# url = "http://grad-schools.usnews.rankingsandreviews.com/best-graduate-schools/top-medical-schools/primary-care-rankings"
-	elif (industry.lower() == "nursing") :
-		# nursing has two different ranking system. 1: Master's, 2: Doctor of Nursing Practice (default: 2)
-
-		# master's
-		# url = "http://grad-schools.usnews.rankingsandreviews.com/best-graduate-schools/top-nursing-schools/nur-rankings"
-
-		# dnp
-		url = "http://grad-schools.usnews.rankingsandreviews.com/best-graduate-schools/top-nursing-schools/dnp-rankings"
-
-	print url
-	print industry.lower(), ":"
-	html_content = requests.get(url).text
-	soup = BeautifulSoup(html_content, "lxml")
+from multiprocessing.pool import ThreadPool
+
+# Site to scrape (can be pointed at a stand-in server, see 'StandInServer.py')
+baseUrl = "http://grad-schools.usnews.rankingsandreviews.com"
+
+# Ranking page of each field
+rankingPaths = {
+	# medicine has two differnt ranking system. 1: research, 2: primary care (default: 1)
+	#   primary care: "/best-graduate-schools/top-medical-schools/primary-care-rankings"
+	# nursing has two different ranking system. 1: Master's, 2: Doctor of Nursing Practice (default: 2)
+	#   master's: "/best-graduate-schools/top-nursing-schools/nur-rankings"
+	"business"    : "/best-graduate-schools/top-business-schools/mba-rankings",
+	"education"   : "/best-graduate-schools/top-education-schools/edu-rankings",
+	"engineering" : "/best-graduate-schools/top-engineering-schools/eng-rankings",
+	"law"         : "/best-graduate-schools/top-law-schools/law-rankings",
+	"medicine"    : "/best-graduate-schools/top-medical-schools/research-rankings",
+	"nursing"     : "/best-graduate-schools/top-nursing-schools/dnp-rankings",
+}
+
+fields = ["business", "education", "engineering", "law", "medicine", "nursing"]
+
+# Cache settings
+
+cacheDir     = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cache', 'rankings')
+cacheEnabled = True
+maxCacheSize = 10 * 1024 * 1024
+ttl          = 365 * HttpClient.day  # Rankings are published once a year
+
+# Whether 'prefetch' loads rankings (set the environment variable GRADINFO_NO_PREFETCH to turn it off,
+# e.g. so that timing the start of GradInfo contacts no site)
+prefetchEnabled = not os.environ.get('GRADINFO_NO_PREFETCH')
+
+# (time fetched, rankings) of each field loaded so far
+loaded = dict()
+
+# Loads of the same field wait for each other instead of fetching the page twice
+fieldLocks = dict((field, threading.Lock()) for field in rankingPaths)
+
+# One ranked school of a field
+class SchoolRanking(object) :
+
+	__slots__ = ('field', 'rank', 'name', 'location', 'tuition')
+
+	# Constructor
+	def __init__(self, field, rank, name, location, tuition) :
+		self.field    = field
+		self.rank     = int(rank)
+		self.name     = name
+		self.location = location
+		self.tuition  = tuition
+
+	# Returns the values stored in the cache for this school
+	def getValues(self) :
+		return [self.rank, self.name, self.location, self.tuition]
+
+	def __repr__(self) :
+		return 'SchoolRanking(' + ', '.join('{}={!r}'.format(key, getattr(self, key)) for key in self.__slots__) + ')'
+
+# Returns the URL of the ranking page of the field, or None if there is no such field
+def getUrl(field) :
+	path = rankingPaths.get(field.lower())
+	return baseUrl + path if path else None
+
+# Returns the list of ranked schools of the field (best first), or None if there is no such
+# field or US News could not be reached (or listed no school) and nothing has been cached
+def getRankings(field) :
+	field = field.lower()
+
+	if field not in rankingPaths :
+		return None
+
+	with fieldLocks[field] :
+		if field in loaded and time.time() - loaded[field][0] < ttl :
+			return loaded[field][1]
+
+		entry = cache.load(field) if cacheEnabled else None
+
+		if entry is None or time.time() - entry['fetched'] >= ttl :
+			try :
+				html_content = HttpClient.get(getUrl(field), source='UsNews')
+				rankings = parseRankings(field, html_content)
+			except requests.RequestException as e :
+				rankings = []
+
+			# A page without rankings (e.g. a changed layout or an error page) is a failure too
+			# Rankings from last year are better than none, and nothing is kept so the next call tries again
+			if not rankings :
+				return [SchoolRanking(field, *values) for values in entry['rankings']] if entry else None
+
+			entry = dict()
+			entry['fetched']  = time.time()
+			entry['rankings'] = [ranking.getValues() for ranking in rankings]
+
+			if cacheEnabled :
+				cache.store(field, entry)
+
+		rankings = [SchoolRanking(field, *values) for values in entry['rankings']]
+		loaded[field] = (entry['fetched'], rankings)
+
+		return rankings
+
+# Returns the rankings of every field (a dictionary of field to rankings), fetching the fields concurrently
+def getAllRankings() :
+	pool = ThreadPool(len(fields))
+	try :
+		return dict(zip(fields, pool.map(getRankings, fields)))
+	finally :
+		pool.terminate()
+
+# Loads the rankings of every field in the background, so they are ready when asked for
+# Each field is loaded on its own thread, outside of any query timed by 'Profiler'
+def prefetch() :
+	if not prefetchEnabled :
+		return
+
+	for field in fields :
+		thread = threading.Thread(target=Profiler.background(getRankings), args=(field,))
+		thread.daemon = True
+		thread.start()
+
+# Returns the rankings (of any field) of schools whose name contains the given school name,
+# for example, "Johns Hopkins" finds "Johns Hopkins University"
+def findSchool(schoolName) :
+	schoolName = QueryUtil.normalizeName(schoolName)
+
+	matches = []
+	for field, rankings in sorted(getAllRankings().items()) :
+		for ranking in rankings or [] :
+			if (' ' + schoolName + ' ') in (' ' + QueryUtil.normalizeName(ranking.name) + ' ') :
+				matches.append(ranking)
+
+	return matches
+
+# Returns the ranked schools listed in the HTML of a ranking page
+def parseRankings(field, html_content) :
+	soup = QueryUtil.parseHtml(html_content, 'UsNews')
 	school_names = soup.find_all(True, {"class":"school-name"})
 	school_locations = soup.find_all(True, {"class" : "location"})
 	school_tuitions = soup.find_all("td", class_=re.compile("search_tuition[\_a-zA-Z]*"))
-	for i in range (len(school_names)) :
-		print i+1, school_names[i].text.encode("utf-8","ignore"), "|", school_locations[i].text.encode("utf-8","ignore"), "|", school_tuitions[i].text.encode("utf-8","ignore").strip()
+
+	rankings = []
+	for i in range (min(len(school_names), len(school_locations), len(school_tuitions))) :
+		rankings.append(SchoolRanking(field, i+1, school_names[i].text, school_locations[i].text, school_tuitions[i].text.strip()))
+	return rankings
+
+def getTop20(industry) :
+	print getUrl(industry) or ""
+	print industry.lower(), ":"
+	rankings = getRankings(industry)
+	if rankings is None :
+		print "Could not reach US News"
+		print
+		return
+	for ranking in rankings :
+		print ranking.rank, ranking.name.encode("utf-8","ignore"), "|", ranking.location.encode("utf-8","ignore"), "|", ranking.tuition.encode("utf-8","ignore")
 	print
 
 def main() :
 	# getTop20("business")
-	fields = ["business", "education", "engineering", "law", "medicine", "nursing"]
+	getAllRankings()
 	for field in fields :
 		getTop20(field)
 
+cache = DiskCache.DiskCache(cacheDir, maxCacheSize, json, '.json')
+
 #main()
@@ -0,0 +1,65 @@
+"""
+Deferred loading of modules, with loading ahead of use on a background thread.
+
+GradInfo shows its menu before importing any scraper or the Predictor, which pull in
+requests, bs4, numpy, pandas and scikit-learn. They are imported in the background while
+the user reads the menu and types a query, and 'load' only waits for a module that is
+not imported yet.
+"""
+
+import atexit
+import importlib
+import threading
+
+# Modules of the GradInfo menu options, in the order they are imported in the background
+# (together they take about a second to import with requests, bs4, pandas and scikit-learn)
+optionModules = ['QueryUtil', 'UsNews', 'GradCafe', 'GoHackers', 'AdmissionStore', 'FacultyInfo', 'StudentInfo', 'Predictor']
+
+# Modules whose import has completed, by name
+# (a module being imported is already in 'sys.modules', so that cannot tell)
+loaded = dict()
+
+# Set at exit to stop importing in the background
+stopped = threading.Event()
+
+# Returns the named module, importing it if needed
+# Python 2 imports one module at a time, so this waits for an import running in the background
+def load(name):
+    module = loaded.get(name)
+
+    if module is None:
+        module = importlib.import_module(name)
+        loaded[name] = module
+
+    return module
+
+# Imports the named modules one after the other on a background thread
+# 'onLoad' maps names to functions called with the module once it is imported (e.g. to start loading data)
+def start(names, onLoad=None):
+    thread = threading.Thread(target=loadAll, args=(names, onLoad or dict()))
+    thread.daemon = True
+    thread.start()
+
+    # Python 2 aborts if the interpreter shuts down in the middle of an import
+    atexit.register(stop, thread)
+
+    return thread
+
+# Stops importing in the background, waiting for the module being imported
+def stop(thread):
+    stopped.set()
+    thread.join()
+
+# Imports the named modules, leaving failures to be reported when the module is used
+def loadAll(names, onLoad):
+    for name in names:
+        if stopped.is_set():
+            return
+
+        try:
+            module = load(name)
+
+            if name in onLoad:
+                onLoad[name](module)
+        except Exception:
+            pass